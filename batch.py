@@ -0,0 +1,23 @@
+import argparse
+from tubecutterdxf import generateBatch, printBatchSummary, MachineProfile, GCODE_DIALECTS
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate DXFs for a batch of saved TubeCutterDXF configs')
+    parser.add_argument('configs', help='Directory of .json configs, or a manifest listing them')
+    parser.add_argument('-o', '--output', default='./output', help='Output directory (default: ./output)')
+    parser.add_argument('-j', '--workers', type=int, default=None, help='Worker processes (default: one per core)')
+    parser.add_argument('--polylines', action='store_true', help='Merge connected segments into polylines')
+    parser.add_argument('--ezdxf', action='store_true', help='Export through an ezdxf document instead of streaming')
+    parser.add_argument('--cache', default=None, help='Directory for a shared geometry cache')
+    parser.add_argument('--thumbnails', action='store_true', help='Render a PNG preview next to each DXF')
+    parser.add_argument('--estimate', action='store_true', help='Estimate cycle times with the default machine profile')
+    parser.add_argument('--blocks', action='store_true', help='Save repeating sections as DXF blocks (leave off for controllers without block support)')
+    parser.add_argument('--binary', action='store_true', help='Write binary DXF (smaller and faster, check your CAM reads it)')
+    parser.add_argument('--gcode', choices=sorted(GCODE_DIALECTS), default=None, help='Also write X/A G-code in this dialect')
+    args = parser.parse_args()
+
+    results = generateBatch(args.configs, args.output, args.workers, streaming=not args.ezdxf, polylines=args.polylines, cacheDir=args.cache, thumbnails=args.thumbnails, machine=MachineProfile() if args.estimate else None, gcode=args.gcode, blocks=args.blocks, binary=args.binary)
+    printBatchSummary(results)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+'''
+Run the TubeCutterDXF benchmarks and compare them against a saved baseline.
+
+    python benchmarks/run.py --save benchmarks/baseline.json
+    python benchmarks/run.py --compare benchmarks/baseline.json
+
+Each benchmark is timed (best of --repeat runs, fresh inputs every run) and
+then run once more under tracemalloc for its peak memory, so tracing never
+skews the timings.  Export benchmarks also report the bytes they wrote.
+Results are written as JSON; with --compare the run fails
+when a benchmark is more than --factor times slower or hungrier than the
+baseline, or goes over its own budget.
+'''
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('MPLBACKEND', 'Agg')
+
+import numpy as np
+import tubecutterdxf
+from suite import benchmarks
+
+def measure(benchmark, repeat):
+    times = []
+    size = None
+    for _ in range(benchmark.repeat or repeat):
+        inputs = benchmark.setup()
+        gc.collect()
+        start = time.perf_counter()
+        result = benchmark.run(inputs)
+        elapsed = time.perf_counter() - start
+        # Benchmarks that time something out of process report it themselves
+        times.append(result if isinstance(result, float) else elapsed)
+        if benchmark.size:
+            size = result
+        del inputs
+
+    inputs = benchmark.setup()
+    gc.collect()
+    tracemalloc.start()
+    benchmark.run(inputs)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    results = {'time': min(times), 'peak': peak}
+    if size is not None:
+        results['bytes'] = size
+    return results
+
+def compare(results, baseline, factor):
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        for metric in ('time', 'peak', 'bytes'):
+            if metric not in result or metric not in baseline[name]:
+                continue
+            before, after = baseline[name][metric], result[metric]
+            if before > 0 and after > before * factor:
+                regressions.append(f'{name}: {metric} {before:.4g} -> {after:.4g} ({after / before:.2f}x)')
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark TubeCutterDXF generation, preview and export')
+    parser.add_argument('-k', '--filter', default='', help='Only run benchmarks whose name contains this')
+    parser.add_argument('--quick', action='store_true', help='Skip the largest instance counts')
+    parser.add_argument('--repeat', type=int, default=3, help='Timed runs per benchmark (default: 3)')
+    parser.add_argument('--save', default=None, help='Write the results to this JSON file')
+    parser.add_argument('--compare', default=None, help='Baseline JSON file to compare against')
+    parser.add_argument('--factor', type=float, default=1.5, help='Allowed slowdown/growth over the baseline (default: 1.5)')
+    args = parser.parse_args()
+
+    # Measure the work itself, not cache lookups
+    tubecutterdxf.setGeometryCache(None)
+
+    results = {}
+    failures = []
+    for benchmark in benchmarks(args.quick):
+        if args.filter not in benchmark.name:
+            continue
+        result = results[benchmark.name] = measure(benchmark, args.repeat)
+        size = f' {result["bytes"] / 2**20:>10.1f} MiB written' if 'bytes' in result else ''
+        print(f'{benchmark.name:<70} {result["time"]:>10.4f} s {result["peak"] / 2**20:>10.1f} MiB{size}', flush=True)
+        if benchmark.budget is not None and result['time'] > benchmark.budget:
+            failures.append(f'{benchmark.name}: {result["time"]:.4g} s over its {benchmark.budget:g} s budget')
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({
+                'date': datetime.now().isoformat(timespec='seconds'),
+                'version': tubecutterdxf.VERSION,
+                'python': platform.python_version(),
+                'numpy': np.__version__,
+                'machine': platform.platform(),
+                'results': results,
+            }, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            failures += compare(results, json.load(f)['results'], args.factor)
+
+    for failure in failures:
+        print('REGRESSION ' + failure)
+    return 1 if failures else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,171 @@
+'''
+Benchmark definitions for benchmarks/run.py.
+
+Each benchmark is a (name, setup, run) triple: setup() builds fresh inputs
+outside the timed region and run(inputs) is the timed call.  A benchmark may
+also carry a budget in seconds that the runner enforces on its own, and with
+`size` its run returns the number of bytes it wrote.
+'''
+import os
+import subprocess
+import sys
+import tempfile
+
+from tubecutterdxf import CutPattern, CutSpiral, CutBrick, CutPartline, INCH, PRECISION, sweep
+
+INSTANCES = (10**2, 10**3, 10**4, 10**5, 10**6)
+QUICK_INSTANCES = (10**2, 10**3, 10**4)
+
+# Spirals the vectorized engine must reproduce within PRECISION of the scalar
+# loop.  Variable lengths are not pre-rounded, and cut + uncut = 180 degrees
+# (even without increments) puts every step on a half tick of the y rounding.
+EQUIVALENCE_SPIRALS = (
+    dict(OD=1, offsetX=0, offsetA=0, cutLength=120, unCutLength=60, pitch=2.54, instances=10000, variableCutLength=True),
+    dict(OD=1, offsetX=0, offsetA=0, cutLength=170, unCutLength=10, pitch=2.54, instances=10000, variableCutLength=True),
+    dict(OD=0.5, offsetX=0, offsetA=0, cutLength=120, unCutLength=15, pitch=2.54, instances=2000, variableCutLength=True),
+    dict(OD=2, offsetX=1.3, offsetA=10, cutLength=179.5, unCutLength=0.5, pitch=-1.5, instances=2000, variableCutLength=True, CW=False),
+    dict(OD=0.5, offsetX=0, offsetA=0, cutLength=170, unCutLength=10, pitch=2.54, instances=3000, variableCutLength=True, cutIncrease=0.02, unCutIncrease=-0.2, CW=False),
+    dict(OD=1, offsetX=0.1 * INCH, offsetA=0, cutLength=30, unCutLength=10, pitch=0.1 * INCH, instances=10000, variableCutLength=True, cutIncrease=0.001, unCutIncrease=-0.0005),
+    dict(OD=1, offsetX=0.1 * INCH, offsetA=0, cutLength=30, unCutLength=10, pitch=0.1 * INCH, instances=10000, variableCutLength=True, cutIncrease=0.001, unCutIncrease=-0.0005, continuous=True),
+    dict(OD=1, offsetX=0.1 * INCH, offsetA=0, cutLength=30, unCutLength=10, pitch=0.1 * INCH, instances=10000),
+)
+
+# Cut lengths swept per instance count, metrics included
+SWEEP_VARIANTS = 100
+
+# Largest pattern pushed through ezdxf and matplotlib; both hold an object per line
+EXPORT_INSTANCES = (10**2, 10**3, 10**4, 10**5)
+QUICK_EXPORT_INSTANCES = (10**2, 10**3)
+
+# Import of the geometry module alone, which must not load ezdxf, matplotlib,
+# prettytable, or the pick/colorama it no longer uses at all
+IMPORT_BUDGET = 1.0
+
+class Benchmark:
+    def __init__(self, name, setup, run, budget=None, repeat=None, size=False):
+        self.name = name
+        self.setup = setup
+        self.run = run
+        self.budget = budget
+        self.repeat = repeat
+        self.size = size
+
+def _spiral(instances, continuous, variable):
+    if variable:
+        return CutSpiral(1, 0.1 * INCH, 0, 30, 10, 0.1 * INCH, instances, True, 10 / instances, -5 / instances, continuous=continuous, lazy=True)
+    return CutSpiral(1, 0.1 * INCH, 0, 30, 10, 0.1 * INCH, instances, continuous=continuous, lazy=True)
+
+def _brick(instances, continuous, variable):
+    if variable:
+        return CutBrick(1, 0.1 * INCH, 0, 90, 3, 45, 0.1 * INCH, instances, True, 20 / instances, continuous=continuous, lazy=True)
+    return CutBrick(1, 0.1 * INCH, 0, 90, 3, 45, 0.1 * INCH, instances, continuous=continuous, lazy=True)
+
+def _equivalence(cases):
+    # Vectorized against vectorized=False, segment for segment
+    import numpy as np
+
+    for args in cases:
+        fast, loop = CutSpiral(**args), CutSpiral(**args, vectorized=False)
+        a, b = fast.segments.array, loop.segments.array
+        if a.shape != b.shape or np.abs(a - b).max(initial=0) > PRECISION or abs(fast.xNext - loop.xNext) > PRECISION:
+            raise AssertionError(f'CutSpiral({args}) differs from the scalar loop')
+
+def _pattern(instances):
+    pattern = CutPattern()
+    pattern.add(CutPartline(1))
+    spiral = _spiral(instances, True, False)
+    pattern.add(spiral)
+    pattern.add(CutBrick(1, spiral.xNext, 0, 90, 3, 45, 0.1 * INCH, instances))
+    return pattern
+
+def _drawn(instances):
+    pattern = _pattern(instances)
+    pattern.draw()
+    return pattern
+
+def _save(streaming, blocks=False, binary=False):
+    def run(pattern):
+        with tempfile.TemporaryDirectory() as outputDir:
+            pattern.save('benchmark', streaming=streaming, blocks=blocks, binary=binary, outputDir=outputDir)
+            return os.path.getsize(os.path.join(outputDir, 'benchmark.dxf'))
+    return run
+
+class _Saved:
+    # A streamed DXF in a directory that goes away with this object
+    def __init__(self, instances, binary):
+        pattern = _pattern(instances)
+        self.segments = pattern.segments().array
+        self._directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self._directory.name, 'benchmark.dxf')
+        pattern.save('benchmark', streaming=True, binary=binary, outputDir=self._directory.name)
+
+def _load(saved):
+    # Read back through ezdxf, the coordinates must come back bit-exact
+    import ezdxf
+    import numpy as np
+
+    lines = ezdxf.readfile(saved.path).modelspace().query('LINE')
+    segments = np.array([(*line.dxf.start.vec2, *line.dxf.end.vec2) for line in lines])
+    if not np.array_equal(segments, saved.segments):
+        raise AssertionError(f'{saved.path} did not round-trip bit-exact')
+
+def _overlaps(pattern):
+    # An empty pattern has to come back with nothing to report, not raise
+    empty = CutPattern()
+    if any(len(pairs) for pairs in empty.findOverlaps().values()) or any(empty.mergeOverlaps().values()):
+        raise AssertionError('findOverlaps()/mergeOverlaps() reported overlaps in an empty pattern')
+    return pattern.findOverlaps()
+
+def _plot(pattern):
+    import matplotlib.pyplot as plt
+
+    pattern.plot()
+    plt.close('all')
+
+def _importTime():
+    # A fresh interpreter, so nothing is already in sys.modules
+    code = ('import sys, time; t = time.perf_counter(); import tubecutterdxf; t = time.perf_counter() - t; '
+            'heavy = [name for name in ("ezdxf", "matplotlib", "prettytable", "pick", "colorama") if name in sys.modules]; '
+            'print(t if not heavy else "heavy imports: " + ", ".join(heavy))')
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    output = subprocess.run([sys.executable, '-c', code], cwd=root, capture_output=True, text=True, check=True).stdout.strip()
+    try:
+        return float(output)
+    except ValueError:
+        raise AssertionError(output)
+
+def benchmarks(quick=False):
+    instances = QUICK_INSTANCES if quick else INSTANCES
+    exportInstances = QUICK_EXPORT_INSTANCES if quick else EXPORT_INSTANCES
+
+    yield Benchmark('import', lambda: None, lambda _: _importTime(), budget=IMPORT_BUDGET)
+
+    for name, make in (('CutSpiral', _spiral), ('CutBrick', _brick)):
+        for n in instances:
+            for continuous in (False, True):
+                for variable in (False, True):
+                    yield Benchmark(f'{name}.generate[instances={n},continuous={continuous},variable={variable}]',
+                                    lambda make=make, n=n, continuous=continuous, variable=variable: make(n, continuous, variable),
+                                    lambda cut: cut.generate())
+            yield Benchmark(f'{name}.iterSegments[instances={n}]', lambda make=make, n=n: make(n, False, False),
+                            lambda cut: sum(len(chunk) for chunk in cut.iterSegments()))
+
+    yield Benchmark('CutSpiral.vectorized[equivalence]', lambda: None, lambda _: _equivalence(EQUIVALENCE_SPIRALS), repeat=1)
+
+    for n in instances[:3]:
+        grid = {'cutLength': [20 + 20 * k / SWEEP_VARIANTS for k in range(SWEEP_VARIANTS)]}
+        params = dict(OD=1, offsetX=0.1 * INCH, offsetA=0, unCutLength=10, pitch=0.1 * INCH, instances=n)
+        yield Benchmark(f'sweep[CutSpiral,variants={SWEEP_VARIANTS},instances={n}]', lambda: None,
+                        lambda _, grid=grid, params=params: sweep('CutSpiral', grid, returnSegments=False, **params))
+
+    for n in exportInstances:
+        yield Benchmark(f'CutPattern.draw[instances={n}]', lambda n=n: _pattern(n), lambda pattern: pattern.draw())
+        yield Benchmark(f'CutPattern.save[instances={n},streaming=False]', lambda n=n: _drawn(n), _save(False), size=True)
+        yield Benchmark(f'CutPattern.save[instances={n},streaming=False,binary=True]', lambda n=n: _drawn(n), _save(False, binary=True), size=True)
+        yield Benchmark(f'CutPattern.save[instances={n},streaming=True]', lambda n=n: _pattern(n), _save(True), size=True)
+        yield Benchmark(f'CutPattern.save[instances={n},streaming=True,binary=True]', lambda n=n: _pattern(n), _save(True, binary=True), size=True)
+        yield Benchmark(f'CutPattern.save[instances={n},streaming=True,blocks=True]', lambda n=n: _pattern(n), _save(True, True), size=True)
+        for binary in (False, True):
+            yield Benchmark(f'ezdxf.readfile[instances={n},binary={binary}]', lambda n=n, binary=binary: _Saved(n, binary), _load, repeat=1)
+        yield Benchmark(f'CutPattern.findOverlaps[instances={n}]', lambda n=n: _pattern(n), _overlaps)
+        yield Benchmark(f'CutPattern.plot[instances={n}]', lambda n=n: _pattern(n), _plot)
@@ -1,15 +1,19 @@
-import ezdxf
-from ezdxf import units
 from math import pi
-from prettytable import PrettyTable
-import matplotlib.pyplot as plt
-import os
 from datetime import datetime
-from time import sleep
+from collections import OrderedDict
+from contextlib import contextmanager
+from time import perf_counter
 import numpy as np
-from pick import pick
-from colorama import Fore, Back, Style
+import hashlib
+import heapq
 import json
+import logging
+import os
+import struct
+import tempfile
+
+# ezdxf, matplotlib and prettytable are imported where they are used so
+# geometry-only jobs don't pay for them (or need a GUI backend)
 
 SOFTWARE_NAME = 'TubeCutterDxf' 
 VERSION = '1.0'
@@ -17,18 +21,1486 @@ VERSION = '1.0'
 PRECISION = 0.000001
 ROUND = 6
 
+# Grid of the fixedPoint geometry mode: integer ticks of 1 nm
+TICKS_PER_MM = 10**6
+
 MM = 1
 M = 1000
 INCH = 25.4
 FEET = INCH * 12
 
+_logger = logging.getLogger(__name__)
+
 def overflow(val, max=2*pi):
     temp = val % max
     
     return temp if temp > 0 else temp + max
 
-class CutSpiral:
-    def __init__(self, OD, offsetX, offsetA, cutLength, unCutLength, pitch, instances, variableCutLength=False, cutIncrease=0, unCutIncrease=0, continuous=False, CW=True):
+def _spiralArrays(c, x_start, x_end, y_start, y_end, cutLength_n, cutSpace_n, cutLength_c, cutSpace_c, cutIncrease_n, cutSpaceIncrease_n, pitch, y_d, CW, variableCutLength, continuous, instances):
+    '''
+    Vectorized version of the CutSpiral instance loop.
+
+    Takes the loop state as it stands before the first instance and returns an
+    (N, 4) array of [x_start, y_start, x_end, y_end] segments along with the
+    state left for the next instance, in the same order as the arguments
+    (x_start, x_end, y_start, y_end, cutLength_n, cutSpace_n, cutLength_c,
+    cutSpace_c), so geometry can be carried on a chunk at a time.
+    '''
+    segments, keep, state = _spiralGrid(c, x_start, x_end, y_start, y_end, cutLength_n, cutSpace_n, cutLength_c, cutSpace_c, cutIncrease_n, cutSpaceIncrease_n, pitch, y_d, CW, variableCutLength, continuous, instances)
+
+    return segments[0][keep[0]], tuple(float(value[0]) for value in state)
+
+def _spiralGrid(c, x_start, x_end, y_start, y_end, cutLength_n, cutSpace_n, cutLength_c, cutSpace_c, cutIncrease_n, cutSpaceIncrease_n, pitch, y_d, CW, variableCutLength, continuous, instances):
+    '''
+    _spiralArrays() for V variants of a spiral at once: the numeric arguments
+    are scalars or (V,) arrays, y_d, CW, the flags and instances are shared.
+    Returns the (V, instances, 2, 4) candidate segments, the (V, instances, 2)
+    mask of the ones that exist and the state as (V,) arrays.  Column i of
+    every array below holds the values the scalar loop sees on iteration i;
+    column `instances` is the state left behind after the last iteration.
+    '''
+    n = instances
+    c, x_start, x_end, y_start, y_end, cutLength_n, cutSpace_n, cutLength_c, cutSpace_c, cutIncrease_n, cutSpaceIncrease_n, pitch = \
+        np.broadcast_arrays(*np.atleast_1d(c, x_start, x_end, y_start, y_end, cutLength_n, cutSpace_n, cutLength_c, cutSpace_c, cutIncrease_n, cutSpaceIncrease_n, pitch))
+    v = len(c)
+    c, pitch = c[:, None], pitch[:, None]
+
+    def run(first, rest):
+        # [first, rest, rest, ...] along each row, n + 1 columns
+        return np.concatenate([first[:, None], np.broadcast_to(rest, (v, n))], axis=1)
+
+    # Cut/uncut lengths used on each iteration (cumulative growth)
+    if variableCutLength:
+        cutLength_n = np.cumsum(run(cutLength_n, cutIncrease_n[:, None]), axis=1)
+        cutSpace_n = np.cumsum(run(cutSpace_n, cutSpaceIncrease_n[:, None]), axis=1)
+        cutLength_c = run(cutLength_c, c * cutLength_n[:, 1:])
+        cutSpace_c = run(cutSpace_c, c * cutSpace_n[:, 1:])
+    else:
+        cutLength_n = np.repeat(cutLength_n[:, None], n + 1, axis=1)
+        cutSpace_n = np.repeat(cutSpace_n[:, None], n + 1, axis=1)
+        cutLength_c = np.repeat(cutLength_c[:, None], n + 1, axis=1)
+        cutSpace_c = np.repeat(cutSpace_c[:, None], n + 1, axis=1)
+
+    # x is never rounded inside the loop so a running sum of the alternating
+    # uncut/cut steps reproduces it exactly: [x_end0, x_start1, x_end1, ...]
+    steps = np.empty((v, 2 * n + 1))
+    steps[:, 0] = x_end
+    steps[:, 1::2] = cutSpace_n[:, 1:] * pitch
+    steps[:, 2::2] = cutLength_n[:, 1:] * pitch
+    steps = np.cumsum(steps, axis=1)
+    xs = run(x_start, steps[:, 1::2])
+    xe = steps[:, 0::2]
+
+    if continuous:
+        steps = np.empty((v, 2 * n + 1))
+        steps[:, 0] = y_end
+        steps[:, 1::2] = cutSpace_c[:, 1:] * y_d
+        steps[:, 2::2] = cutLength_c[:, 1:] * y_d
+        steps = np.cumsum(steps, axis=1)
+        ys = run(y_start, steps[:, 1::2])
+        ye = steps[:, 0::2]
+    else:
+        # The loop rounds y to ROUND decimals after every wrap, so each
+        # instance advances y_end by a whole number of 10^-ROUND ticks.  Track
+        # y_end in integer ticks (exact modulo c), then redo the last step of
+        # each iteration in floats so the overflow/round matches the loop.
+        scale = 10 ** ROUND
+        ticks = np.rint((cutSpace_c[:, 1:] + cutLength_c[:, 1:]) * y_d * scale).astype(np.int64)
+        ticks = np.cumsum(run(np.rint(y_end * scale).astype(np.int64), ticks), axis=1)
+        ticks %= np.rint(c * scale).astype(np.int64)
+        y_prev = np.concatenate([y_end[:, None], ticks[:, 1:n] / scale], axis=1)[:, :n]
+
+        y_next = y_prev + cutSpace_c[:, 1:] * y_d
+        ys = run(y_start, np.round(_overflow(y_next, c), ROUND))
+        ye = run(y_end, np.round(_overflow(y_next + cutLength_c[:, 1:] * y_d, c), ROUND))
+
+        # Unrounded lengths (variableCutLength) can put a step on a half tick,
+        # where only the loop's own running float sum decides which way it
+        # rounds.  Variants with such a step get their y from the loop itself.
+        def half(step):
+            return np.abs((step * y_d * scale) % 1 - 0.5) < 1e-4
+
+        for k in np.flatnonzero((half(cutSpace_c[:, 1:]) | half(cutSpace_c[:, 1:] + cutLength_c[:, 1:])).any(axis=1)).tolist():
+            ys[k, 1:], ye[k, 1:] = _spiralY(float(c[k, 0]), float(y_end[k]), cutSpace_c[k, 1:], cutLength_c[k, 1:], y_d)
+
+    state = tuple(value[:, n] for value in (xs, xe, ys, ye, cutLength_n, cutSpace_n, cutLength_c, cutSpace_c))
+    xs, ys, xe, ye = xs[:, :n], ys[:, :n], xe[:, :n], ye[:, :n]
+    cutLength_c = cutLength_c[:, :n]
+
+    # Wrap around test, see the truth table in CutSpiral.__init__
+    wrap = ~(((ys < ye) != (xs < xe)) != CW)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if y_d == 1:
+            percentOver = ye / cutLength_c
+            y_end_temp, y_start_temp = c, 0
+        else:
+            percentOver = (c - ye) / cutLength_c
+            y_end_temp, y_start_temp = 0, c
+        x_end_temp = xe - (xe - xs) * percentOver
+
+    # Every instance yields up to two segments: the part before the wrap and
+    # the (remaining) part after it
+    segments = np.empty((v, n, 2, 4))
+    segments[:, :, 0, 0] = xs
+    segments[:, :, 0, 1] = ys
+    segments[:, :, 0, 2] = x_end_temp
+    segments[:, :, 0, 3] = y_end_temp
+    segments[:, :, 1, 0] = np.where(wrap, x_end_temp, xs)
+    segments[:, :, 1, 1] = np.where(wrap, y_start_temp, ys)
+    segments[:, :, 1, 2] = xe
+    segments[:, :, 1, 3] = ye
+
+    keep = np.empty((v, n, 2), dtype=bool)
+    keep[:, :, 0] = wrap & (np.abs(ye - ys) > PRECISION)
+    keep[:, :, 1] = np.abs(ye - segments[:, :, 1, 1]) > PRECISION
+
+    return segments, keep, state
+
+def _spiralY(c, y_end, cutSpace_c, cutLength_c, y_d):
+    # y_start/y_end of the non-continuous CutSpiral loop after each instance, one at a time
+    ys, ye = [], []
+    for cutSpace, cutLength in zip(cutSpace_c.tolist(), cutLength_c.tolist()):
+        y_start = y_end + cutSpace * y_d
+        y_end = y_start + cutLength * y_d
+        y_start = round(overflow(y_start, c), ROUND)
+        y_end = round(overflow(y_end, c), ROUND)
+        ys.append(y_start)
+        ye.append(y_end)
+    return ys, ye
+
+def _roundDiv(a, b):
+    # a / b rounded to the nearest integer, exact for int64 arrays (b > 0)
+    return (2 * a + b) // (2 * b)
+
+def _spiralFixed(c, x0, y0, cutLength, cutSpace, cutIncrease, cutSpaceIncrease, pitch, y_d, continuous, instances, first=0, T0=0):
+    '''
+    CutSpiral geometry on an integer grid (all arguments are int64 ticks, see
+    TICKS_PER_MM, except y_d, continuous and instances).
+
+    Every instance is placed by its distance T along the unrolled spiral: y is
+    y0 + T * y_d, wrapped with an exact integer modulo c, and x is
+    x0 + T / c * pitch, rounded once per point rather than accumulated.
+    Nothing is rounded along the way, so there is no drift however many
+    instances there are, and wrap splits land exactly on the seam.  Returns
+    the (N, 4) int64 segment array with xNext/yNext and the T the next
+    instance starts at.  Passing that back as `T0`, with `first` the number of
+    instances done so far, carries on from there.
+    '''
+    n = instances
+    i = np.arange(first, first + n + 1, dtype=np.int64)
+    cutLength = cutLength + i * cutIncrease
+    cutSpace = cutSpace + i * cutSpaceIncrease
+
+    # [start0, end0, start1, end1, ... startN], the uncut before instance i is cutSpace[i]
+    steps = np.zeros(2 * n + 1, dtype=np.int64)
+    steps[0] = T0
+    steps[1::2] = cutLength[:n]
+    steps[2::2] = cutSpace[1:]
+    T = np.cumsum(steps)
+
+    def xAt(T):
+        q, r = np.divmod(T, c)
+        return x0 + q * pitch + _roundDiv(r * pitch, c)
+
+    def yAt(T):
+        return y0 + T * y_d
+
+    Ts, Te = T[0:2 * n:2], T[1::2]
+    a, b = yAt(Ts), yAt(Te)
+
+    if continuous:
+        segments = np.stack([xAt(Ts), a, xAt(Te), b], axis=1)
+        segments = segments[a != b]
+        xNext, yNext = xAt(T[-1]), yAt(T[-1])
+    else:
+        # A cut (shorter than c) crosses the seam at most once, at B; split it
+        # there and bring each piece into its own revolution [k * c, (k + 1) * c]
+        B = (np.minimum(a, b) // c + 1) * c
+        wrap = np.maximum(a, b) > B
+        TB = (B - y0) * y_d
+        xB = np.where(wrap, xAt(TB), xAt(Te))
+        yB = np.where(wrap, B, b)
+
+        pieces = np.empty((n, 2, 4), dtype=np.int64)
+        pieces[:, 0] = np.stack([xAt(Ts), a, xB, yB], axis=1)
+        pieces[:, 1] = np.stack([xB, yB, xAt(Te), b], axis=1)
+        k = np.minimum(pieces[:, :, 1], pieces[:, :, 3]) // c
+        pieces[:, :, 1] -= k * c
+        pieces[:, :, 3] -= k * c
+
+        keep = np.stack([a != yB, wrap], axis=1)
+        segments = pieces[keep]
+        xNext, yNext = xAt(T[-1]), yAt(T[-1]) % c
+
+    # Exact duplicates (either direction) are dropped, keeping the first
+    forward = (segments[:, 0] < segments[:, 2]) | ((segments[:, 0] == segments[:, 2]) & (segments[:, 1] <= segments[:, 3]))
+    canonical = np.where(forward[:, None], segments, segments[:, [2, 3, 0, 1]])
+    first = np.unique(canonical, axis=0, return_index=True)[1]
+    segments = segments[np.sort(first)]
+
+    return segments, int(xNext), int(yNext), int(T[-1])
+
+def _brickArrays(c, x, y_start, y_end, cutLength_c, cutSpace_c, cutIncrease_c, spacingA_c, numRadialCuts, pitch, variableCutLength, continuous, instances, row=None):
+    '''
+    Vectorized version of the CutBrick row/radial cut loops.
+
+    Builds the (instances, numRadialCuts) grid of cut positions with
+    broadcasting and splits every cut that wraps past the circumference in a
+    single masked pass.  Returns the (N, 4) segment array along with the cut
+    and uncut lengths left behind after the last row and the `row` state to
+    carry on from there in another call: x, unwrapped y and continuous shift
+    of the next row.
+    '''
+    segments, keep, cutLength_c, cutSpace_c, row = _brickGrid(c, x, y_start, y_end, cutLength_c, cutSpace_c, cutIncrease_c, spacingA_c, numRadialCuts, pitch, variableCutLength, continuous, instances, row)
+
+    return segments[0][keep[0]], float(cutLength_c[0]), float(cutSpace_c[0]), tuple(float(value[0]) for value in row)
+
+def _brickGrid(c, x, y_start, y_end, cutLength_c, cutSpace_c, cutIncrease_c, spacingA_c, numRadialCuts, pitch, variableCutLength, continuous, instances, row=None):
+    '''
+    _brickArrays() for V variants of a brick at once: the numeric arguments
+    are scalars or (V,) arrays, numRadialCuts, the flags and instances are
+    shared.  Returns the (V, instances, numRadialCuts, 2, 4) candidate
+    segments, the mask of the ones that exist, and the lengths and row state
+    left after the last row as (V,) arrays.
+    '''
+    n = instances
+    m = numRadialCuts
+    c, x, y_start, y_end, cutLength_c, cutSpace_c, cutIncrease_c, spacingA_c, pitch = \
+        np.broadcast_arrays(*np.atleast_1d(c, x, y_start, y_end, cutLength_c, cutSpace_c, cutIncrease_c, spacingA_c, pitch))
+    v = len(c)
+
+    def run(first, rest):
+        # [first, rest, rest, ...] along each row, n + 1 columns
+        return np.concatenate([first[:, None], np.broadcast_to(rest, (v, n))], axis=1)
+
+    # Cut/uncut lengths used on each row (index n is what is left after the last row)
+    if variableCutLength:
+        cutLength_c = np.cumsum(run(cutLength_c, cutIncrease_c[:, None]), axis=1)
+        cutSpace_c = run(cutSpace_c, (c[:, None] / m) - cutLength_c[:, 1:])
+    else:
+        cutLength_c = np.repeat(cutLength_c[:, None], n + 1, axis=1)
+        cutSpace_c = np.repeat(cutSpace_c[:, None], n + 1, axis=1)
+
+    # Each cut starts one cut + uncut after the last, each row additionally
+    # steps by spacingA
+    step = cutLength_c[:, :n] + cutSpace_c[:, :n]
+    first = row is None
+    if first:
+        # Only the very first cut is wrapped; in a continuous pattern
+        # everything after it follows on from that (possibly wrapped) end
+        row = (x, y_start, y_end - (y_start + cutLength_c[:, 0]))
+    x, rowStart, shift = np.broadcast_arrays(*np.atleast_1d(*row))
+    rowStart = np.cumsum(run(rowStart, m * step + spacingA_c[:, None]), axis=1)
+    xs = np.cumsum(run(x, pitch[:, None]), axis=1)
+    row = (xs[:, n], rowStart[:, n], shift)
+    rowStart, xs = rowStart[:, :n], xs[:, :n]
+
+    y_starts = rowStart[:, :, None] + np.arange(m) * step[:, :, None]
+    y_ends = y_starts + cutLength_c[:, :n, None]
+
+    c = c[:, None, None]
+    if continuous:
+        y_starts += shift[:, None, None]
+        y_ends += shift[:, None, None]
+    else:
+        # Positions that land on the seam come out of the modulo as either ~0 or
+        # ~c depending on rounding noise.  Pin them so a cut ending on the seam
+        # ends at c and a cut starting on it starts at 0, rather than picking
+        # up a zero length piece on the other side.
+        y_starts %= c
+        y_ends %= c
+        y_starts = np.where(y_starts > c - PRECISION, 0, y_starts)
+        y_ends = np.where(y_ends < PRECISION, c, y_ends)
+
+    if n and m and first:
+        y_starts[:, 0, 0] = y_start
+        y_ends[:, 0, 0] = y_end
+
+    xs = np.broadcast_to(xs[:, :, None], y_starts.shape)
+
+    # Every cut yields up to two segments: the part up to the circumference
+    # and the (remaining) part after it
+    wrap = y_starts > y_ends
+    segments = np.empty((v, n, m, 2, 4))
+    segments[..., 0] = xs[..., None]
+    segments[..., 2] = xs[..., None]
+    segments[..., 0, 1] = y_starts
+    segments[..., 0, 3] = c
+    segments[..., 1, 1] = np.where(wrap, 0, y_starts)
+    segments[..., 1, 3] = y_ends
+
+    keep = np.ones((v, n, m, 2), dtype=bool)
+    keep[..., 0] = wrap
+
+    return segments, keep, cutLength_c[:, n], cutSpace_c[:, n], row
+
+def _overflow(val, max):
+    # Array version of overflow()
+    temp = np.mod(val, max)
+
+    return np.where(temp > 0, temp, temp + max)
+
+def _chainBreaks(segments, tol=PRECISION):
+    '''
+    Split an (N, 4) segment array into runs where each segment starts where the
+    previous one ended.  Returns the indices where each chain starts followed
+    by N, so chain k is segments[breaks[k]:breaks[k + 1]].
+
+    Pieces split at the circumference are only joined to neighbours on their
+    own side of the seam: joining across it would draw a line back over the
+    whole circumference.
+    '''
+    gaps = np.abs(segments[1:, :2] - segments[:-1, 2:]).max(axis=1) > tol if len(segments) else np.empty(0, dtype=bool)
+
+    return np.r_[0, np.flatnonzero(gaps) + 1, len(segments)] if len(segments) else np.zeros(1, dtype=np.intp)
+
+def _chainVertices(segments, start, end):
+    # Vertices of the polyline through segments[start:end]
+    return np.r_[segments[start:start + 1, :2], segments[start:end, 2:]]
+
+def _travel(a, b, c=None):
+    # Distance from points a to points b on the unrolled tube, wrapping y at c
+    dx = b[..., 0] - a[..., 0]
+    dy = np.abs(b[..., 1] - a[..., 1])
+    if c:
+        dy %= c
+        dy = np.minimum(dy, c - dy)
+
+    return np.hypot(dx, dy)
+
+def _nearestNeighbourOrder(starts, ends, c=None, rings=4):
+    '''
+    Greedy tour over M reversible paths given their (M, 2) start and end
+    points: from wherever the last path ended go to the closest unvisited
+    start or end.  Endpoints are bucketed in a grid (wrapping in y at c) and
+    searched ring by ring outwards so each step only looks at nearby paths.
+    Past `rings` rings out, a pyramid of occupancy counts (each level merging
+    2 x 2 cells of the one below) is searched best first from the top, which
+    skips emptied regions without visiting their cells.
+
+    Returns the visiting order and whether each visited path is reversed.
+    '''
+    m = len(starts)
+    if m == 0:
+        return np.zeros(0, dtype=np.intp), np.zeros(0, dtype=bool)
+
+    points = np.concatenate([starts, ends])
+    if c:
+        points[:, 1] %= c
+    xs = points[:, 0].tolist()
+    ys = points[:, 1].tolist()
+
+    xMin = min(xs)
+    yMin = 0 if c else min(ys)
+    xSpan = max(max(xs) - xMin, PRECISION)
+    ySpan = c if c else max(max(ys) - yMin, PRECISION)
+
+    # Roughly a couple of endpoints per cell
+    size = max((xSpan * ySpan / m) ** 0.5, PRECISION)
+    nx = int(xSpan / size) + 1
+    ny = max(int(ySpan / size), 1)
+    hx = xSpan / nx
+    hy = ySpan / ny
+
+    def cellOf(x, y):
+        return (min(max(int((x - xMin) / hx), 0), nx - 1), min(max(int((y - yMin) / hy), 0), ny - 1))
+
+    cells = {}
+    for k in range(2 * m):
+        cells.setdefault(cellOf(xs[k], ys[k]), set()).add(k)
+
+    # counts[l][i << 32 | j]: endpoints left in level 0 cells [i << l, (i + 1) << l) x [j << l, (j + 1) << l)
+    cellI = np.minimum((points[:, 0] - xMin) / hx, nx - 1).astype(np.int64)
+    cellJ = np.minimum(np.maximum((points[:, 1] - yMin) / hy, 0), ny - 1).astype(np.int64)
+    top = max(nx - 1, ny - 1).bit_length()
+    counts = [None]
+    for l in range(1, top + 1):
+        keys, n = np.unique(((cellI >> l) << 32) | (cellJ >> l), return_counts=True)
+        counts.append(dict(zip(keys.tolist(), n.tolist())))
+    cellI, cellJ = cellI.tolist(), cellJ.tolist()
+
+    def take(item):
+        for k in (item, item + m):
+            i, j = cellI[k], cellJ[k]
+            cells[(i, j)].discard(k)
+            for l in range(1, top + 1):
+                counts[l][(i >> l) << 32 | (j >> l)] -= 1
+
+    def gap(l, i, j, x, y):
+        # Distance from (x, y) to level l cell (i, j)
+        x0, x1 = xMin + (i << l) * hx, xMin + min((i + 1) << l, nx) * hx
+        y0, y1 = yMin + (j << l) * hy, yMin + min((j + 1) << l, ny) * hy
+        dx = max(x0 - x, x - x1, 0)
+        if y0 <= y <= y1:
+            dy = 0
+        elif c:
+            dy = min(abs(y - y0), c - abs(y - y0), abs(y - y1), c - abs(y - y1))
+        else:
+            dy = max(y0 - y, y - y1)
+        return (dx * dx + dy * dy) ** 0.5
+
+    def search(x, y, best, bestDist):
+        # Best first down the pyramid, cells no nearer than the best endpoint so far are never opened
+        heap = [(0.0, top, 0, 0)]
+        while heap:
+            d, l, i, j = heapq.heappop(heap)
+            if d >= bestDist:
+                break
+            if l == 0:
+                for k in cells.get((i, j), ()):
+                    dy = abs(ys[k] - y)
+                    if c:
+                        dy = min(dy, c - dy)
+                    d = ((xs[k] - x) ** 2 + dy ** 2) ** 0.5
+                    if d < bestDist:
+                        best, bestDist = k, d
+                continue
+            for a in (2 * i, 2 * i + 1):
+                for b in (2 * j, 2 * j + 1):
+                    if (cells.get((a, b)) if l == 1 else counts[l - 1].get(a << 32 | b)):
+                        heapq.heappush(heap, (gap(l - 1, a, b, x, y), l - 1, a, b))
+        return best
+
+    order = [0]
+    flipped = [False]
+    take(0)
+    x, y = xs[m], ys[m]
+
+    for _ in range(m - 1):
+        ci, cj = cellOf(x, y)
+        best, bestDist = None, float('inf')
+
+        for r in range(0, rings + 1):
+            for di in range(-r, r + 1):
+                i = ci + di
+                if i < 0 or i >= nx:
+                    continue
+                for dj in ((-r, r) if abs(di) != r and r else range(-r, r + 1)):
+                    j = (cj + dj) % ny if c else cj + dj
+                    if j < 0 or j >= ny:
+                        continue
+                    for k in cells.get((i, j), ()):
+                        dy = abs(ys[k] - y)
+                        if c:
+                            dy = min(dy, c - dy)
+                        d = ((xs[k] - x) ** 2 + dy ** 2) ** 0.5
+                        if d < bestDist:
+                            best, bestDist = k, d
+
+            # Anything further out is at least r cells away
+            if bestDist <= r * min(hx, hy):
+                break
+        else:
+            # Nothing close by, find the nearest endpoint left through the pyramid
+            best = search(x, y, best, bestDist)
+
+        item = best % m
+        order.append(item)
+        flipped.append(best >= m)
+        take(item)
+        x, y = (xs[item], ys[item]) if best >= m else (xs[item + m], ys[item + m])
+
+    return np.array(order, dtype=np.intp), np.array(flipped, dtype=bool)
+
+def _twoOpt(starts, ends, order, flipped, c=None, window=50, passes=5):
+    '''
+    Bounded 2-opt refinement of a path order: reverse runs of up to `window`
+    paths (which also reverses each path in the run) wherever that shortens
+    the travel in and out of the run.  Each pass scores every run at once and
+    applies the best non-overlapping ones.
+    '''
+    order = order.copy()
+    flipped = flipped.copy()
+    m = len(order)
+    if m < 3:
+        return order, flipped
+
+    for _ in range(passes):
+        s = np.where(flipped[:, None], ends[order], starts[order])
+        e = np.where(flipped[:, None], starts[order], ends[order])
+
+        # Reversing s/e[i + 1:j + 1] swaps travel e[i]->s[i + 1] and e[j]->s[j + 1]
+        # for e[i]->e[j] and s[i + 1]->s[j + 1].  Scored in blocks of i to
+        # keep the (block, window) arrays small.
+        best = np.empty(m - 2)
+        bestJ = np.empty(m - 2, dtype=np.intp)
+        for i0 in range(0, m - 2, 8192):
+            i = np.arange(i0, min(i0 + 8192, m - 2))[:, None]
+            j = np.minimum(i + np.arange(1, window + 1), m - 1)
+            last = j == m - 1
+            jn = np.minimum(j + 1, m - 1)
+
+            before = _travel(e[i], s[i + 1], c) + np.where(last, 0, _travel(e[j], s[jn], c))
+            after = _travel(e[i], e[j], c) + np.where(last, 0, _travel(s[i + 1], s[jn], c))
+            gain = before - after
+
+            k = np.argmax(gain, axis=1)
+            best[i0:i0 + len(i)] = gain[np.arange(len(i)), k]
+            bestJ[i0:i0 + len(i)] = j[np.arange(len(i)), k]
+
+        candidates = np.flatnonzero(best > PRECISION)
+        if len(candidates) == 0:
+            break
+
+        # Apply the biggest gains first, skipping any run touching one already applied
+        used = np.zeros(m + 1, dtype=bool)
+        for a in candidates[np.argsort(-best[candidates])].tolist():
+            b = int(bestJ[a])
+            if used[a:b + 2].any():
+                continue
+            used[a:b + 2] = True
+            order[a + 1:b + 1] = order[a + 1:b + 1][::-1]
+            flipped[a + 1:b + 1] = ~flipped[a + 1:b + 1][::-1]
+
+    return order, flipped
+
+def _lineRuns(segments, c, tol):
+    '''
+    Sort segments into runs along shared lines.  Segments are shifted by whole
+    turns so they start within one circumference, oriented the same way, and
+    grouped by their quantized direction and offset from the origin.  Returns
+    the shifted and oriented segments, the sort order, each sorted segment's
+    extent (t0, t1) along its line, and a mask of where a new line starts.
+    '''
+    segments = segments.copy()
+    if c:
+        segments[:, 1::2] -= (np.minimum(segments[:, 1], segments[:, 3]) // c)[:, None] * c
+
+    # Orient along +x (or +y for vertical lines) so collinear segments agree
+    dx, dy = segments[:, 2] - segments[:, 0], segments[:, 3] - segments[:, 1]
+    backward = (dx < 0) | ((dx == 0) & (dy < 0))
+    segments[backward] = segments[backward][:, [2, 3, 0, 1]]
+    dx, dy = np.abs(dx), np.where(backward, -dy, dy)
+
+    # Zero length segments have no direction of their own, treat them as along x
+    length = np.hypot(dx, dy)
+    safe = np.where(length > 0, length, 1)
+    ux, uy = np.where(length > 0, dx / safe, 1), dy / safe
+    angle = np.rint(np.arctan2(uy, ux) / tol).astype(np.int64)
+    offset = np.rint((ux * segments[:, 1] - uy * segments[:, 0]) / tol).astype(np.int64)
+    t0 = ux * segments[:, 0] + uy * segments[:, 1]
+    t1 = t0 + length
+
+    order = np.lexsort((t1, t0, offset, angle))
+    newLine = np.ones(len(order), dtype=bool)
+    newLine[1:] = (angle[order][1:] != angle[order][:-1]) | (offset[order][1:] != offset[order][:-1])
+
+    return segments, order, t0[order], t1[order], newLine
+
+def _runningMax(values, newLine):
+    # Running maximum of values, restarting at every new line, and the index it came from
+    n = len(values)
+    if not n:
+        return values, np.zeros(0, dtype=np.int64)
+
+    # Lift each line above the one before it so one accumulate serves them all
+    line = np.cumsum(newLine) - 1
+    base = np.minimum.reduceat(values, np.flatnonzero(newLine))[line]
+    shifted = values - base
+    span = float(shifted.max()) + 1
+    shifted += line * span
+
+    runMax = np.maximum.accumulate(shifted)
+    owner = np.maximum.accumulate(np.where(shifted == runMax, np.arange(n), 0))
+    return runMax - line * span + base, owner
+
+def _findOverlaps(segments, c=None, tol=PRECISION, gap=0.01):
+    '''
+    Find segments that would be cut twice or nearly so: exact duplicates
+    (within tol), collinear segments overlapping by more than tol, and
+    endpoints of different segments closer than `gap` but not joined.  Points
+    on the seam (A = 0 and A = c) count as the same.  Everything is done with
+    sorts, so this stays O(N log N).
+
+    Returns a dict of (k, 2) arrays of segment index pairs [kept, other]:
+    'duplicates', 'overlaps' and 'gaps', plus for the gaps 'gapEnds', which
+    end of each segment (0 start, 1 end), and 'gapPoints', the (k, 4)
+    endpoint pairs.
+    '''
+    segments = np.asarray(segments, dtype=np.float64).reshape(-1, 4)
+    n = len(segments)
+    if n == 0:
+        pairs = np.empty((0, 2), dtype=np.int64)
+        return {'duplicates': pairs, 'overlaps': pairs, 'gaps': pairs, 'gapEnds': pairs, 'gapPoints': np.empty((0, 4))}
+    shifted, order, t0, t1, newLine = _lineRuns(segments, c, tol)
+    valid = t1 - t0 > tol
+
+    # Duplicates: same snapped endpoints as the segment before them on the line
+    snapped = np.rint(shifted[order] / tol).astype(np.int64)
+    same = np.zeros(n, dtype=bool)
+    same[1:] = (snapped[1:] == snapped[:-1]).all(axis=1) & ~newLine[1:]
+    first = order[np.maximum.accumulate(np.where(same, 0, np.arange(n)))]
+    duplicates = np.stack([first[same], order[same]], axis=1)
+
+    # Overlaps: starting before the furthest end so far on the same line
+    ends = np.where(valid & ~same, t1, t0)
+    runMax, owner = _runningMax(ends, newLine)
+    prevMax, prevOwner = np.r_[-np.inf, runMax[:-1]], np.r_[0, owner[:-1]].astype(np.int64)
+    overlap = ~same & valid & ~newLine & (t0 < prevMax - tol)
+    overlaps = np.stack([order[prevOwner[overlap]], order[overlap]], axis=1)
+
+    # Gaps: distinct endpoint locations within `gap` of each other, found by
+    # hashing them into gap sized cells (wrapping around the seam) and
+    # comparing every point with the 3x3 cells around it
+    points = segments.reshape(-1, 2).copy()
+    if c:
+        points[:, 1] %= c
+        points[np.abs(points[:, 1] - c) <= tol, 1] = 0
+    locations, pointIdx = np.unique(np.rint(points / tol).astype(np.int64), axis=0, return_index=True)
+    locations = points[pointIdx]
+
+    cellX = np.floor(locations[:, 0] / gap).astype(np.int64)
+    cellY = np.floor(locations[:, 1] / gap).astype(np.int64)
+    rows = int(np.ceil(c / gap)) if c else int(cellY.max() - cellY.min() + 3 if len(cellY) else 1)
+    cellY = cellY % rows if c else cellY - cellY.min() + 1
+    keys = cellX * rows + cellY
+    sortKeys = np.argsort(keys, kind='stable')
+    keys = keys[sortKeys]
+
+    pairs = []
+    for ox in (-1, 0, 1):
+        for oy in (-1, 0, 1):
+            ny = (cellY[sortKeys] + oy) % rows if c else cellY[sortKeys] + oy
+            target = (cellX[sortKeys] + ox) * rows + ny
+            lo, hi = np.searchsorted(keys, target, 'left'), np.searchsorted(keys, target, 'right')
+            counts = hi - lo
+            a = np.repeat(np.arange(len(keys)), counts)
+            b = np.repeat(lo - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+            keep = a < b
+            pairs.append(np.stack([a[keep], b[keep]], axis=1))
+    pairs = np.unique(np.concatenate(pairs), axis=0) if pairs else np.empty((0, 2), dtype=np.int64)
+
+    a, b = locations[sortKeys[pairs[:, 0]]], locations[sortKeys[pairs[:, 1]]]
+    dy = np.abs(a[:, 1] - b[:, 1])
+    if c:
+        dy = np.minimum(dy, c - dy)
+    distance = np.hypot(a[:, 0] - b[:, 0], dy)
+    pa, pb = pointIdx[sortKeys[pairs[:, 0]]], pointIdx[sortKeys[pairs[:, 1]]]
+    near = (distance < gap) & (distance > tol) & (pa // 2 != pb // 2)
+    pa, pb = pa[near], pb[near]
+    gapOrder = np.lexsort((pb, pa))
+    pa, pb = pa[gapOrder], pb[gapOrder]
+    pa, pb = np.minimum(pa, pb), np.maximum(pa, pb)
+    gaps = np.stack([pa // 2, pb // 2], axis=1)
+    gapEnds = np.stack([pa % 2, pb % 2], axis=1)
+    gapPoints = np.concatenate([segments.reshape(-1, 2)[pa], segments.reshape(-1, 2)[pb]], axis=1)
+
+    return {'duplicates': duplicates, 'overlaps': overlaps, 'gaps': gaps, 'gapEnds': gapEnds, 'gapPoints': gapPoints}
+
+def _pointSegment(p, s):
+    # Closest points on segments s to points p, row by row
+    d = s[:, 2:] - s[:, :2]
+    lengthSq = (d * d).sum(axis=1)
+    t = np.clip(((p - s[:, :2]) * d).sum(axis=1) / np.where(lengthSq > 0, lengthSq, 1), 0, 1)
+    return s[:, :2] + t[:, None] * d
+
+def _segmentDistance(a, b):
+    '''
+    Distance between segments a and b, row by row, and the closest points on
+    each: (k,), (k, 2), (k, 2).  Crossing segments are 0 apart.
+    '''
+    candidates = [(a[:, :2], _pointSegment(a[:, :2], b)), (a[:, 2:], _pointSegment(a[:, 2:], b)),
+                  (_pointSegment(b[:, :2], a), b[:, :2]), (_pointSegment(b[:, 2:], a), b[:, 2:])]
+    distances = np.stack([np.hypot(*(q - p).T) for p, q in candidates])
+    best = distances.argmin(axis=0)
+    rows = np.arange(len(a))
+    p = np.stack([p for p, q in candidates])[best, rows]
+    q = np.stack([q for p, q in candidates])[best, rows]
+    distance = distances[best, rows]
+
+    def side(s, points):
+        return np.sign((s[:, 2] - s[:, 0]) * (points[:, 1] - s[:, 1]) - (s[:, 3] - s[:, 1]) * (points[:, 0] - s[:, 0]))
+    crossing = (side(a, b[:, :2]) * side(a, b[:, 2:]) < 0) & (side(b, a[:, :2]) * side(b, a[:, 2:]) < 0)
+    distance[crossing] = 0
+
+    return distance, p, q
+
+def _strutViolations(segments, c, minWidth, tol=PRECISION):
+    '''
+    Pairs of segments that come closer than `minWidth` without touching,
+    with the tube wrapped at c.  Only pairs of segments sharing a cell of a
+    grid hash are measured, never all pairs.
+    '''
+    segments = np.asarray(segments, dtype=np.float64).reshape(-1, 4)
+    n = len(segments)
+    source = np.arange(n)
+    shift = np.zeros(n)
+
+    if c and n:
+        # One turn of the tube, plus copies across the seam of what lies near it
+        shift = -(np.minimum(segments[:, 1], segments[:, 3]) // c) * c
+        shifted = segments + np.array([0, 1, 0, 1]) * shift[:, None]
+        low = np.flatnonzero(np.minimum(shifted[:, 1], shifted[:, 3]) < minWidth)
+        high = np.flatnonzero(np.maximum(shifted[:, 1], shifted[:, 3]) > c - minWidth)
+        source = np.r_[source, low, high]
+        shift = np.r_[shift, shift[low] + c, shift[high] - c]
+        segments = segments[source] + np.array([0, 1, 0, 1]) * shift[:, None]
+
+    # Each segment goes into every grid cell its bounding box, grown by
+    # minWidth / 2, touches, so two segments closer than minWidth share a cell.
+    # Cells about the size of a typical segment's box keep that to a few
+    # cells per segment and a few segments per cell.
+    m = len(segments)
+    width, height = np.abs(segments[:, 2] - segments[:, 0]), np.abs(segments[:, 3] - segments[:, 1])
+    cellX = max(2 * minWidth, float(np.median(width)) if m else 0)
+    cellY = max(2 * minWidth, float(np.median(height)) if m else 0)
+    x0 = np.floor((np.minimum(segments[:, 0], segments[:, 2]) - minWidth / 2) / cellX).astype(np.int64)
+    x1 = np.floor((np.maximum(segments[:, 0], segments[:, 2]) + minWidth / 2) / cellX).astype(np.int64)
+    y0 = np.floor((np.minimum(segments[:, 1], segments[:, 3]) - minWidth / 2) / cellY).astype(np.int64)
+    y1 = np.floor((np.maximum(segments[:, 1], segments[:, 3]) + minWidth / 2) / cellY).astype(np.int64)
+
+    ny = y1 - y0 + 1
+    counts = (x1 - x0 + 1) * ny
+    owner = np.repeat(np.arange(m), counts)
+    k = np.arange(len(owner)) - np.repeat(np.cumsum(counts) - counts, counts)
+    cellX = x0[owner] + k // ny[owner]
+    cellY = y0[owner] + k % ny[owner]
+
+    rows = int(y1.max() - y0.min()) + 1 if m else 1
+    keys = (cellX - (x0.min() if m else 0)) * rows + cellY - (y0.min() if m else 0)
+    order = np.argsort(keys, kind='stable')
+    keys, owner = keys[order], owner[order]
+
+    # Every pair sharing a cell
+    counts = np.searchsorted(keys, keys, 'right') - np.arange(len(keys)) - 1
+    a = np.repeat(owner, counts)
+    b = owner[np.repeat(np.arange(len(keys)) + 1 - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())]
+
+    # Each pair of (copies of) segments is measured once, however many cells they share
+    pairs = np.unique(np.minimum(a, b) * m + np.maximum(a, b))
+    a, b = pairs // m, pairs % m
+    keep = source[a] != source[b]
+    a, b = a[keep], b[keep]
+
+    distance, p, q = _segmentDistance(segments[a], segments[b])
+    close = (distance < minWidth) & (distance > tol)
+    a, b, distance, p, q = a[close], b[close], distance[close], p[close], q[close]
+
+    # Back to each segment's own coordinates, closest pair per segment pair
+    p[:, 1] -= shift[a]
+    q[:, 1] -= shift[b]
+    i, j = source[a], source[b]
+    swap = i > j
+    i, j = np.where(swap, j, i), np.where(swap, i, j)
+    p, q = np.where(swap[:, None], q, p), np.where(swap[:, None], p, q)
+    order = np.lexsort((distance, j, i))
+    i, j = i[order], j[order]
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = (i[1:] != i[:-1]) | (j[1:] != j[:-1])
+    i, j, first = i[first], j[first], order[first]
+    narrowest = np.argsort(distance[first], kind='stable')
+    i, j, first = i[narrowest], j[narrowest], first[narrowest]
+
+    return {'pairs': np.stack([i, j], axis=1), 'distance': distance[first],
+            'points': np.concatenate([p[first], q[first]], axis=1)}
+
+def _blockRun(segments, start, period, tol=PRECISION):
+    '''
+    How many copies of the block segments[start:start + period] follow on
+    from it, each moved by the same (dx, dy) and within `tol` of the
+    original.  Returns (reps, dx, dy), reps counting the block itself.
+    '''
+    def fit(reps):
+        # Spacing from the first to last copy so rounding in the original doesn't add up
+        dx, dy = (segments[start + (reps - 1) * period, :2] - segments[start, :2]) / (reps - 1)
+        dx = 0.0 if abs(dx) * (reps - 1) <= tol else float(dx)
+        dy = 0.0 if abs(dy) * (reps - 1) <= tol else float(dy)
+
+        copies = segments[start:start + reps * period].reshape(reps, period, 4)
+        error = np.abs(copies - copies[0] - np.arange(reps)[:, None, None] * np.array([dx, dy, dx, dy])).max()
+        return error <= tol, dx, dy
+
+    # Small steps add up over many copies: double while they fit, then bisect
+    maxReps = (len(segments) - start) // period
+    good, bad = 1, maxReps + 1
+    reps = 2
+    while reps <= maxReps:
+        if not fit(reps)[0]:
+            bad = reps
+            break
+        good = reps
+        reps *= 2
+    bad = min(bad, maxReps + 1)
+
+    while bad - good > 1:
+        mid = (good + bad) // 2
+        if fit(mid)[0]:
+            good = mid
+        else:
+            bad = mid
+
+    return (good, *fit(good)[1:]) if good > 1 else (1, 0.0, 0.0)
+
+def _periodicSection(segments, c, tol=PRECISION, tries=16):
+    '''
+    Find the longest run of an (N, 4) segment array that is one block of
+    `period` segments repeated `reps` times, each copy moved by (dx, dy) from
+    the last.  Candidate periods are the later segments that look like one
+    taken a quarter of the way in (same length and direction, same place
+    around the tube), so rows of a brick or turns of a spiral are found
+    without knowing the cut parameters.  Returns (start, period, reps, dx, dy)
+    or None if nothing repeats.  Copies match the original to within `tol`.
+    '''
+    n = len(segments)
+    if n < 4:
+        return None
+
+    a = n // 4
+    ref = segments[a]
+    around = np.abs(segments[a + 1:, 1] - ref[1]) % c
+    candidates = np.flatnonzero((np.minimum(around, c - around) <= tol) &
+                                (np.abs((segments[a + 1:, 2:] - segments[a + 1:, :2]) - (ref[2:] - ref[:2])).max(axis=1) <= tol))[:tries] + 1
+
+    best = None
+    for period in candidates.tolist():
+        if best is not None and period % best[1] == 0:
+            continue
+
+        # Runs where every segment is the one a period earlier moved rigidly by the same amount
+        d = segments[period:] - segments[:-period]
+        ok = (np.abs(d - d[a]).max(axis=1) <= tol) & (abs(d[a, 0] - d[a, 2]) <= tol) & (abs(d[a, 1] - d[a, 3]) <= tol)
+        bad = np.flatnonzero(~ok)
+        start = int(bad[bad < a][-1]) + 1 if (bad < a).any() else 0
+        end = int(bad[bad > a][0]) if (bad > a).any() else len(ok)
+        reps = (end + period - start) // period
+        if reps >= 2 and (best is None or reps * period > best[1] * best[2]):
+            best = (start, period, reps)
+
+    if best is None:
+        return None
+
+    start, period, _ = best
+    reps, dx, dy = _blockRun(segments, start, period, tol)
+
+    return (start, period, reps, dx, dy) if reps >= 2 else None
+
+def _periodicSections(segments, c, tol=PRECISION):
+    '''
+    Non-overlapping periodic sections (see _periodicSection) covering as much
+    of an (N, 4) segment array as possible, in order.
+    '''
+    sections = []
+    pending = [(0, len(segments))]
+    while pending:
+        lo, hi = pending.pop()
+        section = _periodicSection(segments[lo:hi], c, tol)
+        if section is None:
+            continue
+
+        start, period, reps, dx, dy = section
+        start += lo
+        sections.append((start, period, reps, dx, dy))
+        pending.append((lo, start))
+
+        # A run cut short by drift carries on as a new block with the same period
+        end = start + period * reps
+        while True:
+            reps, dx, dy = _blockRun(segments[:hi], end, period, tol)
+            if reps < 2:
+                break
+            sections.append((end, period, reps, dx, dy))
+            end += period * reps
+        pending.append((end, hi))
+
+    return sorted(sections)
+
+def _inserts(reps, dx, dy):
+    # (x, y, columns, rows, columnSpacing, rowSpacing) of the INSERTs placing reps copies of a block dx, dy apart
+    if dy == 0:
+        return [(0.0, 0.0, reps, 1, dx, 0.0)]
+    if dx == 0:
+        return [(0.0, 0.0, 1, reps, 0.0, dy)]
+    return [(k * dx, k * dy, 1, 1, 0.0, 0.0) for k in range(reps)]
+
+def _decimate(segments, xlim, ylim, width, height):
+    '''
+    The segments worth drawing in a `width` x `height` pixel view of xlim x
+    ylim: only those in view, and of those lying wholly inside it only one
+    per distinct pair of end pixels.
+    '''
+    x0, x1 = sorted(xlim)
+    y0, y1 = sorted(ylim)
+    px, py = (x1 - x0) / max(width, 1), (y1 - y0) / max(height, 1)
+    if not len(segments) or px <= 0 or py <= 0:
+        return segments
+
+    xMin, xMax = segments[:, 0::2].min(axis=1), segments[:, 0::2].max(axis=1)
+    yMin, yMax = segments[:, 1::2].min(axis=1), segments[:, 1::2].max(axis=1)
+    visible = (xMax >= x0) & (xMin <= x1) & (yMax >= y0) & (yMin <= y1)
+    inside = visible & (xMin >= x0) & (xMax <= x1) & (yMin >= y0) & (yMax <= y1)
+
+    # Segments crossing the edge of the view are kept as they are
+    crossing = segments[visible & ~inside]
+    inner = segments[inside]
+
+    qx = ((inner[:, 0::2] - x0) / px).astype(np.int64)
+    qy = ((inner[:, 1::2] - y0) / py).astype(np.int64)
+    m = int(max(width, height)) + 2
+    a, b = qx[:, 0] * m + qy[:, 0], qx[:, 1] * m + qy[:, 1]
+    keys = np.minimum(a, b) * (m * m) + np.maximum(a, b)
+    first = np.sort(np.unique(keys, return_index=True)[1])
+
+    return np.concatenate([inner[first], crossing])
+
+def _plotSegments(segments, color=None, ax=None):
+    '''
+    Add an (N, 4) segment array to `ax` (default: the current axes) as one
+    LineCollection.  Whenever the view changes only the visible segments are
+    shown, and those that land on the same pixels only once, so patterns of
+    millions of segments still pan and zoom smoothly.
+    '''
+    import matplotlib.pyplot as plt
+    from matplotlib.collections import LineCollection
+
+    ax = ax or plt.gca()
+    if color is None:
+        colors = plt.rcParams['axes.prop_cycle'].by_key()['color']
+        color = colors[len(ax.collections) % len(colors)]
+
+    collection = LineCollection([], colors=[color])
+    ax.add_collection(collection)
+    if len(segments):
+        ax.update_datalim([(segments[:, 0::2].min(), segments[:, 1::2].min()), (segments[:, 0::2].max(), segments[:, 1::2].max())])
+
+    shown = [None]
+    def update(*args):
+        view = (ax.get_xlim(), ax.get_ylim(), ax.bbox.width, ax.bbox.height)
+        if view != shown[0]:
+            shown[0] = view
+            collection.set_segments(_decimate(segments, *view).reshape(-1, 2, 2))
+
+    # Plain functions, so the callback registries hold on to them
+    ax.callbacks.connect('xlim_changed', update)
+    ax.callbacks.connect('ylim_changed', update)
+    ax.figure.canvas.mpl_connect('resize_event', update)
+    ax.autoscale_view()
+    update()
+
+    return collection
+
+def _rasterize(image, segments, color, x0, y1, scaleX, scaleY, chunkSize=2**18):
+    '''
+    Draw an (N, 4) segment array into an (H, W, 3) image as 1 pixel lines.
+    Pixel column = (x - x0) * scaleX and row = (y1 - y) * scaleY.  Segments
+    are snapped to whole pixels and those ending on the same pair of pixels
+    drawn once, then each is stepped DDA style, one point per pixel along its
+    longer axis, with all the steps of a chunk of segments generated at once.
+    '''
+    height, width = image.shape[:2]
+
+    px = np.rint((segments[:, 0::2] - x0) * scaleX)
+    py = np.rint((y1 - segments[:, 1::2]) * scaleY)
+    inside = (px.min(axis=1) >= 0) & (px.max(axis=1) < width) & (py.min(axis=1) >= 0) & (py.max(axis=1) < height)
+    a = py[inside, 0].astype(np.int64) * width + px[inside, 0].astype(np.int64)
+    b = py[inside, 1].astype(np.int64) * width + px[inside, 1].astype(np.int64)
+    keys = np.unique(np.minimum(a, b) * (width * height) + np.maximum(a, b))
+    a, b = keys // (width * height), keys % (width * height)
+    pixels = np.concatenate([np.stack([a % width, a // width, b % width, b // width], axis=1).astype(np.float64),
+                             np.concatenate([px[~inside], py[~inside]], axis=1)[:, [0, 2, 1, 3]]])
+
+    for i in range(0, len(pixels), chunkSize):
+        chunk = pixels[i:i + chunkSize]
+        px, py = chunk[:, 0::2], chunk[:, 1::2]
+        dx, dy = px[:, 1] - px[:, 0], py[:, 1] - py[:, 0]
+
+        # Long segments are clipped to the image size, anything past it is off the image anyway
+        steps = np.minimum(np.ceil(np.maximum(np.abs(dx), np.abs(dy))), width + height).astype(np.int64) + 1
+        owner = np.repeat(np.arange(len(chunk)), steps)
+        t = np.arange(len(owner)) - np.repeat(np.cumsum(steps) - steps, steps)
+        t = t / np.maximum(steps - 1, 1)[owner]
+
+        cols = np.rint(px[owner, 0] + t * dx[owner]).astype(np.int64)
+        rows = np.rint(py[owner, 0] + t * dy[owner]).astype(np.int64)
+        keep = (cols >= 0) & (cols < width) & (rows >= 0) & (rows < height)
+        image[rows[keep], cols[keep]] = color
+
+def _rechunk(arrays, chunkSize):
+    # Regroup a stream of (N, 4) arrays into chunkSize rows each, the last one shorter
+    pending, count = [], 0
+    for array in arrays:
+        pending.append(array)
+        count += len(array)
+        if count >= chunkSize:
+            merged = np.concatenate(pending)
+            full = len(merged) // chunkSize * chunkSize
+            for i in range(0, full, chunkSize):
+                yield merged[i:i + chunkSize]
+            pending, count = [merged[full:]], len(merged) - full
+
+    if count:
+        yield np.concatenate(pending)
+
+class Segments:
+    '''
+    Growable store of line segments backed by a single (N, 4) float64 array of
+    [x_start, y_start, x_end, y_end] rows.
+
+    Indexing, slicing and iteration hand out views into the array.  `lines`
+    gives the old ((x_start, y_start), (x_end, y_end)) tuple form.
+    '''
+    def __init__(self, data=None, capacity=16):
+        if data is None:
+            self._data = np.empty((capacity, 4))
+            self._n = 0
+        else:
+            self._data = np.asarray(data, dtype=np.float64).reshape(-1, 4)
+            self._n = len(self._data)
+
+    @property
+    def array(self):
+        return self._data[:self._n]
+
+    @property
+    def lines(self):
+        return _LinesView(self)
+
+    def _reserve(self, n):
+        if n > len(self._data):
+            # Grow geometrically so repeated appends are amortized O(1)
+            data = np.empty((max(n, 2 * len(self._data), 16), 4))
+            data[:self._n] = self.array
+            self._data = data
+
+    def append(self, start, end):
+        self._reserve(self._n + 1)
+        self._data[self._n] = (start[0], start[1], end[0], end[1])
+        self._n += 1
+
+    def extend(self, segments):
+        segments = np.asarray(segments, dtype=np.float64).reshape(-1, 4)
+        self._reserve(self._n + len(segments))
+        self._data[self._n:self._n + len(segments)] = segments
+        self._n += len(segments)
+
+    @classmethod
+    def concatenate(cls, parts):
+        '''
+        Join several stores into one.  The parts are rebound to views of the
+        result so the geometry is only held in memory once.
+        '''
+        data = np.concatenate([part.array for part in parts]) if parts else np.empty((0, 4))
+
+        i = 0
+        for part in parts:
+            part._data = data[i:i + part._n]
+            i += part._n
+
+        return cls(data)
+
+    def __len__(self):
+        return self._n
+
+    def __iter__(self):
+        return iter(self.array)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return Segments(self.array[key])
+
+        return self.array[key]
+
+class _LinesView:
+    # Read only ((x_start, y_start), (x_end, y_end)) view of a Segments store
+    def __init__(self, segments):
+        self._segments = segments
+
+    def __len__(self):
+        return len(self._segments)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return [((x0, y0), (x1, y1)) for x0, y0, x1, y1 in self._segments.array[key].tolist()]
+
+        x0, y0, x1, y1 = self._segments.array[key].tolist()
+        return ((x0, y0), (x1, y1))
+
+    def __iter__(self):
+        array = self._segments.array
+        for i in range(0, len(array), 4096):
+            for x0, y0, x1, y1 in array[i:i + 4096].tolist():
+                yield ((x0, y0), (x1, y1))
+
+class GeometryCache:
+    '''
+    Content addressed cache of generated cut geometry.
+
+    Entries are keyed on a hash of the cut type, its dumpConfig() and the
+    library version, so any cut built with the same parameters reuses the
+    geometry instead of regenerating it.  Recently used entries are kept in
+    memory up to `maxBytes`; with a `directory` they are also written there as
+    .npy files (plus a small .json of generator state), oldest first evicted
+    past `maxDiskBytes`.  Cached arrays are shared, so treat them as read only.
+
+        setGeometryCache(GeometryCache(directory='./cache'))
+    '''
+    def __init__(self, maxBytes=256 * 2**20, directory=None, maxDiskBytes=4 * 2**30):
+        self.maxBytes = maxBytes
+        self.directory = directory
+        self.maxDiskBytes = maxDiskBytes
+        self.hits = 0
+        self.misses = 0
+
+        self._memory = OrderedDict()
+        self._bytes = 0
+
+        if self.directory is not None:
+            os.makedirs(self.directory, exist_ok=True)
+
+    @staticmethod
+    def key(cut):
+        config = {'type': cut.type, 'config': cut.dumpConfig(), 'version': VERSION}
+        return hashlib.sha256(json.dumps(config, sort_keys=True).encode()).hexdigest()
+
+    def get(self, key):
+        # (segments, state) for key or None
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            self.hits += 1
+            return self._memory[key]
+
+        if self.directory is not None:
+            path = os.path.join(self.directory, key)
+            try:
+                segments = np.load(path + '.npy', allow_pickle=False)
+                with open(path + '.json') as f:
+                    state = json.load(f)
+            except (OSError, ValueError):
+                pass
+            else:
+                # Mark as recently used for disk eviction
+                os.utime(path + '.npy')
+                self.hits += 1
+                return self._remember(key, segments, state)
+
+        self.misses += 1
+        return None
+
+    def put(self, key, segments, state):
+        entry = self._remember(key, segments, state)
+
+        if self.directory is not None:
+            # Written to temporary files first so other processes never see half a file
+            path = os.path.join(self.directory, key)
+            fd, jsonTemp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            with os.fdopen(fd, 'w') as f:
+                json.dump(state, f)
+            fd, npyTemp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                np.save(f, segments, allow_pickle=False)
+            os.replace(jsonTemp, path + '.json')
+            os.replace(npyTemp, path + '.npy')
+            self._evictDisk()
+
+        return entry
+
+    def clear(self):
+        self._memory.clear()
+        self._bytes = 0
+
+        if self.directory is not None:
+            for entry in os.scandir(self.directory):
+                if entry.name.endswith(('.npy', '.json')):
+                    os.remove(entry.path)
+
+    def _remember(self, key, segments, state):
+        segments = segments.view()
+        segments.flags.writeable = False
+
+        if key in self._memory:
+            self._bytes -= self._memory.pop(key)[0].nbytes
+        self._memory[key] = (segments, state)
+        self._bytes += segments.nbytes
+
+        while self._bytes > self.maxBytes and len(self._memory) > 1:
+            self._bytes -= self._memory.popitem(last=False)[1][0].nbytes
+
+        return segments, state
+
+    def _evictDisk(self):
+        files = [entry for entry in os.scandir(self.directory) if entry.name.endswith('.npy')]
+        total = sum(entry.stat().st_size for entry in files)
+
+        for entry in sorted(files, key=lambda entry: entry.stat().st_mtime):
+            if total <= self.maxDiskBytes:
+                break
+            total -= entry.stat().st_size
+            for name in (entry.path, entry.path[:-4] + '.json'):
+                try:
+                    os.remove(name)
+                except OSError:
+                    pass
+
+_geometryCache = None
+
+def setGeometryCache(cache):
+    '''
+    Use `cache` (a GeometryCache, or None to turn caching off) for all cuts
+    generated from here on.
+    '''
+    global _geometryCache
+    _geometryCache = cache
+
+def getGeometryCache():
+    return _geometryCache
+
+class Span:
+    '''
+    One timed step of a job: `name` is what ran ('generate', 'cache', 'draw',
+    'saveas' or 'config'), `label` what it ran on, and `segments`, `entities`
+    and `bytes` what it produced.
+    '''
+    __slots__ = ('name', 'label', 'elapsed', 'segments', 'entities', 'bytes', '_stats', '_start')
+
+    def __init__(self, name, label='', elapsed=0.0, segments=0, entities=0, bytes=0, stats=None):
+        self.name = name
+        self.label = label
+        self.elapsed = elapsed
+        self.segments = segments
+        self.entities = entities
+        self.bytes = bytes
+        self._stats = stats
+
+    def __enter__(self):
+        self._start = perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = perf_counter() - self._start
+        self._stats.record(self)
+
+    def asDict(self):
+        return {name: getattr(self, name) for name in ('name', 'label', 'elapsed', 'segments', 'entities', 'bytes')}
+
+    def __repr__(self):
+        return f'{self.name} {self.label}: {self.elapsed:.6f} s, {self.segments} segments, {self.entities} entities, {self.bytes} bytes'
+
+class _NullSpan:
+    # Stands in for a Span while stats are off, anything set on it goes nowhere
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+    def __setattr__(self, name, value):
+        pass
+
+_NULL_SPAN = _NullSpan()
+
+class Stats:
+    '''
+    Collects a Span for every cut generated, drawn and saved while it is the
+    active stats object (see setStats() and profiling()).  With log=True each
+    span is also logged at INFO level on the 'tubecutterdxf' logger.
+    '''
+    def __init__(self, log=False):
+        self.log = log
+        self.spans = []
+        # Filled in by profiling()
+        self.profile = None
+        self.peakMemory = None
+
+    def record(self, span):
+        self.spans.append(span)
+        if self.log:
+            _logger.info('%r', span)
+
+    def totals(self):
+        # Spans summed up by name, in the order first seen
+        totals = {}
+        for span in self.spans:
+            total = totals.setdefault(span.name, {'count': 0, 'elapsed': 0.0, 'segments': 0, 'entities': 0, 'bytes': 0})
+            total['count'] += 1
+            total['elapsed'] += span.elapsed
+            total['segments'] += span.segments
+            total['entities'] += span.entities
+            total['bytes'] += span.bytes
+        return totals
+
+    def clear(self):
+        self.spans = []
+
+    def printStats(self):
+        from prettytable import PrettyTable
+
+        table = PrettyTable(['Step', 'Count', 'Time (s)', 'Segments', 'Entities', 'Bytes'])
+        table.align['Step'] = 'l'
+
+        for name, total in self.totals().items():
+            table.add_row([name, total['count'], f"{total['elapsed']:.4f}", total['segments'], total['entities'], total['bytes']])
+
+        print(table)
+        if self.peakMemory is not None:
+            print(f'Peak memory: {self.peakMemory / 2**20:.1f} MiB')
+
+_stats = None
+
+def setStats(stats):
+    '''
+    Record spans into `stats` (a Stats, or None to turn instrumentation off)
+    from here on.
+    '''
+    global _stats
+    _stats = stats
+
+def getStats():
+    return _stats
+
+def _span(name, label=''):
+    return _NULL_SPAN if _stats is None else Span(name, label, stats=_stats)
+
+@contextmanager
+def profiling(cpu=True, memory=True, log=False):
+    '''
+    Instrument everything run inside the block, and optionally profile it:
+    cpu=True runs cProfile (stats.profile, a pstats.Stats) and memory=True
+    tracemalloc (stats.peakMemory, in bytes).
+
+        with profiling() as stats:
+            pattern.save('newCutPattern')
+        stats.printStats()
+        stats.profile.sort_stats('cumulative').print_stats(20)
+    '''
+    import tracemalloc
+
+    global _stats
+    stats, previous = Stats(log), _stats
+    _stats = stats
+
+    tracing = tracemalloc.is_tracing()
+    if memory:
+        if tracing:
+            tracemalloc.reset_peak()
+        else:
+            tracemalloc.start()
+
+    profiler = None
+    if cpu:
+        import cProfile
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+
+    try:
+        yield stats
+    finally:
+        if profiler is not None:
+            import pstats
+
+            profiler.disable()
+            stats.profile = pstats.Stats(profiler)
+        if memory:
+            stats.peakMemory = tracemalloc.get_traced_memory()[1]
+            if not tracing:
+                tracemalloc.stop()
+        _stats = previous
+
+class _Cut:
+    '''
+    Plumbing shared by the cut types.  Subclasses set up their parameters,
+    then call generate() unless they are lazy; _generate() fills
+    self.segments and any attributes named in _generatedState.  A lazy cut
+    generates its geometry the first time any of those are used.
+    _iterGenerate() yields the same geometry a chunk of instances at a time
+    for iterSegments().
+    '''
+    _generatedState = ()
+    _segments = None
+
+    @property
+    def segments(self):
+        if self._segments is None:
+            self.generate()
+        return self._segments
+
+    @segments.setter
+    def segments(self, segments):
+        self._segments = segments
+
+    def __getattr__(self, name):
+        # Only called for missing attributes, i.e. generated state of a lazy cut
+        if name in type(self)._generatedState and self._segments is None:
+            self.generate()
+            return getattr(self, name)
+        raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+
+    def generate(self):
+        self._checkBounded()
+        with _span('generate', self.type) as span:
+            cache = _geometryCache
+            if cache is not None:
+                key = cache.key(self)
+                entry = cache.get(key)
+                if entry is None:
+                    self._generate()
+                    entry = cache.put(key, self.segments.array, self._state())
+                else:
+                    span.name = 'cache'
+                self._adopt(*entry)
+            else:
+                self._generate()
+            span.segments = len(self._segments)
+
+    def _checkBounded(self):
+        if getattr(self, 'instances', 0) is None:
+            raise ValueError(f'{self.type} has no end (instances=None), use iterSegments()')
+
+    def _state(self):
+        return {name: getattr(self, name) for name in self._generatedState}
+
+    def _adopt(self, segments, state):
+        # Take on geometry generated elsewhere (cache, another process)
+        self.segments = Segments(segments)
+        for name, value in state.items():
+            setattr(self, name, value)
+
+    def iterSegments(self, chunkSize=65536):
+        '''
+        Yield the segments as (chunkSize, 4) arrays, the last one shorter.  A
+        cut that hasn't been generated yet is generated a chunk at a time,
+        carrying the loop state from one chunk to the next, so memory use
+        stays flat however many instances there are; with instances=None it
+        never ends.  Nothing is kept on the cut.
+        '''
+        if self._segments is not None:
+            array = self._segments.array
+            for i in range(0, len(array), chunkSize):
+                yield array[i:i + chunkSize]
+            return
+
+        yield from _rechunk(self._iterGenerate(chunkSize), chunkSize)
+
+    def _iterGenerate(self, chunkSize):
+        # Cuts without instances come in one piece
+        self._generate()
+        segments, self._segments = self._segments, None
+        yield segments.array
+
+    def _sweepKey(self):
+        # Cuts with equal keys can be generated together by _sweepGroup(), None for one at a time
+        return None
+
+    def _chunks(self, chunkSize, perInstance):
+        # Instance counts of the chunks making up the cut, forever if it has no end
+        step = max(1, chunkSize // perInstance)
+        done = 0
+        while self.instances is None or done < self.instances:
+            n = step if self.instances is None else min(step, self.instances - done)
+            yield done, n
+            done += n
+
+    @property
+    def lines(self):
+        return self.segments.lines
+
+    def plot(self, ax=None):
+        return _plotSegments(self.segments.array, ax=ax)
+
+class CutSpiral(_Cut):
+    _generatedState = ('xNext', 'yNext')
+
+    def __init__(self, OD, offsetX, offsetA, cutLength, unCutLength, pitch, instances, variableCutLength=False, cutIncrease=0, unCutIncrease=0, continuous=False, CW=True, vectorized=True, fixedPoint=False, lazy=False):
         self.type = 'CutSpiral'
         self.OD = OD
         self.offsetX = offsetX
@@ -41,8 +1513,19 @@ class CutSpiral:
         self.pitch = pitch
         self.instances = instances
         self.continuous = continuous
+        self.CW = CW
+        self.vectorized = vectorized
+        self.fixedPoint = fixedPoint
+
+        # Normalized from 0 to c (the circumference of the tube)
+        self.c = round(self.OD * pi, ROUND)
+
+        if not lazy and instances is not None:
+            self.generate()
 
-        self.lines = list()
+    def _start(self):
+        # Normalized lengths and the loop state before the first instance
+        offsetX, pitch, continuous, CW = self.offsetX, self.pitch, self.continuous, self.CW
 
         # Normalized from 0 to 1
         # offsetA_n = round((overflow(self.offsetA, 360) if not continuous else self.offsetA) / 360, ROUND)
@@ -53,7 +1536,6 @@ class CutSpiral:
         cutSpaceIncrease_n = round(self.unCutIncrease / 360, ROUND)
 
         # Normalized from 0 to c (the circumference of the tube)
-        self.c = round(self.OD * pi, ROUND)
         offsetA_c = round(self.c * offsetA_n, ROUND)
         cutLength_c = round(self.c * cutLength_n, ROUND)
         cutSpace_c = round(self.c * cutSpace_n, ROUND)
@@ -75,6 +1557,28 @@ class CutSpiral:
 
         # y_end = round((y_start + cutLength_c * d) % (self.c if not continuous else 1), ROUND)
 
+        return (x_start, x_end, y_start, y_end, cutLength_n, cutSpace_n, cutLength_c, cutSpace_c), cutIncrease_n, cutSpaceIncrease_n, y_d
+
+    def _generate(self):
+        pitch, instances = self.pitch, self.instances
+        variableCutLength, continuous, CW = self.variableCutLength, self.continuous, self.CW
+
+        if self.fixedPoint:
+            self._generateFixed()
+            return
+
+        self.segments = Segments()
+        state, cutIncrease_n, cutSpaceIncrease_n, y_d = self._start()
+        x_start, x_end, y_start, y_end, cutLength_n, cutSpace_n, cutLength_c, cutSpace_c = state
+
+        if self.vectorized:
+            # Same geometry as the loop below, computed for every instance at once
+            segments, state = _spiralArrays(self.c, x_start, x_end, y_start, y_end, cutLength_n, cutSpace_n, cutLength_c, cutSpace_c, cutIncrease_n, cutSpaceIncrease_n, pitch, y_d, CW, variableCutLength, continuous, instances)
+            self.xNext, self.yNext = state[0], state[2]
+            self.segments = Segments(segments)
+            return
+
+        # Scalar reference implementation
         for i in range(0, instances):
             '''
             Use Right Hand rule with thumb pointing distally (-x direction; or to the left)
@@ -116,7 +1620,7 @@ class CutSpiral:
                 if (abs(y_end - y_start) > PRECISION):
                     # if y_end > 3.14:
                     #     print(i)
-                    self.lines.append(((x_start, y_start), (x_end_temp, y_end_temp)))
+                    self.segments.append((x_start, y_start), (x_end_temp, y_end_temp))
             
                 x_start = x_end_temp
                 y_start = y_start_temp
@@ -124,7 +1628,7 @@ class CutSpiral:
             if (abs(y_end - y_start) > PRECISION):
                 # if y_end > 3.14:
                 #     print(i)
-                self.lines.append(((x_start, y_start), (x_end, y_end)))
+                self.segments.append((x_start, y_start), (x_end, y_end))
 
             if (self.variableCutLength):
                 cutLength_n += cutIncrease_n
@@ -146,7 +1650,54 @@ class CutSpiral:
         
         self.xNext = x_start
         self.yNext = y_start
-    
+
+    def _fixedArgs(self):
+        # _spiralFixed() arguments, lengths along the circumference in ticks of an exact integer circumference
+        c = round(self.OD * pi * TICKS_PER_MM)
+        ticks = lambda angle: round(angle / 360 * c)
+        variable = self.variableCutLength
+        y_d = (1 if self.pitch > 0 else -1) * (1 if self.CW else -1)
+
+        return (c, round(self.offsetX * TICKS_PER_MM), ticks(self.offsetA), ticks(self.cutLength), ticks(self.unCutLength),
+                ticks(self.cutIncrease) if variable else 0, ticks(self.unCutIncrease) if variable else 0,
+                round(self.pitch * TICKS_PER_MM), y_d, self.continuous)
+
+    def _generateFixed(self):
+        segments, xNext, yNext, _ = _spiralFixed(*self._fixedArgs(), self.instances)
+
+        self.segments = Segments(segments / TICKS_PER_MM)
+        self.xNext = xNext / TICKS_PER_MM
+        self.yNext = yNext / TICKS_PER_MM
+
+    def _iterGenerate(self, chunkSize):
+        # Up to two segments per instance.  Duplicates in fixed point are only dropped within a chunk.
+        if self.fixedPoint:
+            args, T = self._fixedArgs(), 0
+            for first, n in self._chunks(chunkSize, 2):
+                segments, _, _, T = _spiralFixed(*args, n, first, T)
+                yield segments / TICKS_PER_MM
+            return
+
+        state, cutIncrease_n, cutSpaceIncrease_n, y_d = self._start()
+        for _, n in self._chunks(chunkSize, 2):
+            segments, state = _spiralArrays(self.c, *state, cutIncrease_n, cutSpaceIncrease_n, self.pitch, y_d, self.CW, self.variableCutLength, self.continuous, n)
+            yield segments
+
+    def _sweepKey(self):
+        if self.fixedPoint or self.instances is None:
+            return None
+        return type(self), self.instances, self.variableCutLength, self.continuous, self.CW, self.pitch > 0
+
+    @staticmethod
+    def _sweepGroup(cuts):
+        starts = [cut._start() for cut in cuts]
+        state = (np.array(column) for column in zip(*(start[0] for start in starts)))
+        cutIncrease_n, cutSpaceIncrease_n = (np.array(column) for column in zip(*(start[1:3] for start in starts)))
+        first = cuts[0]
+        segments, keep, state = _spiralGrid(np.array([cut.c for cut in cuts]), *state, cutIncrease_n, cutSpaceIncrease_n, np.array([cut.pitch for cut in cuts]),
+                                            starts[0][3], first.CW, first.variableCutLength, first.continuous, first.instances)
+        return segments, keep, state[0]
+
     def dumpConfig(self):
         return {
             'type': self.type,
@@ -160,24 +1711,23 @@ class CutSpiral:
             'unCutIncrease': self.unCutIncrease,
             'pitch': self.pitch,
             'instances': self.instances,
-            'continuous': self.continuous
+            'continuous': self.continuous,
+            'CW': self.CW,
+            'fixedPoint': self.fixedPoint
         }
 
-    def plot(self):
-        color = np.random.rand(3)
-        for start, end in self.lines:
-            plt.plot([start[0], end[0]], [start[1], end[1]], color=color)
+    def plot(self, ax=None):
+        return _plotSegments(self.segments.array, np.random.rand(3), ax)
 
     def draw(self, doc):
         msp = doc.modelspace()
 
-        for start, end in self.lines:
-            msp.add_line(start, end, dxfattribs={"layer": "MyLayer"})
-            # print("start: ", start)
-            # print("end ", end, "\n")
+        return [msp.add_line((x0, y0), (x1, y1), dxfattribs={"layer": "MyLayer"}) for x0, y0, x1, y1 in self.segments.array.tolist()]
+
+class CutBrick(_Cut):
+    _generatedState = ('cutLength_c', 'cutSpace_c')
 
-class CutBrick:
-    def __init__(self, OD, offsetX, offsetA, cutLength, numRadialCuts, spacingA, pitch, instances, variableCutLength=False, cutIncrease=0, variablePitch=False, continuous=False):
+    def __init__(self, OD, offsetX, offsetA, cutLength, numRadialCuts, spacingA, pitch, instances, variableCutLength=False, cutIncrease=0, variablePitch=False, continuous=False, vectorized=True, lazy=False):
         self.type = 'CutBrick'
         self.OD = OD
         self.offsetX = offsetX
@@ -191,30 +1741,49 @@ class CutBrick:
         self.variablePitch = variablePitch
         self.instances = instances
         self.continuous = continuous
+        self.vectorized = vectorized
 
         self.cutSpace = (360 / self.numRadialCuts) - self.cutLength
 
         self.c = self.OD * pi
         self.offsetA_c = self.offsetA / 360 * self.c
-        self.cutLength_c = self.cutLength / 360 * self.c
-        self.cutSpace_c = self.cutSpace / 360 * self.c
         self.cutIncrease_c = self.cutIncrease / 360 * self.c
         self.spacingA_c = self.spacingA / 360 * self.c
 
-        self.lines = []
+        if not lazy and instances is not None:
+            self.generate()
+
+    def _start(self):
+        # x, y_start, y_end, cutLength_c and cutSpace_c before the first row
+        cutLength_c = self.cutLength / 360 * self.c
+        cutSpace_c = self.cutSpace / 360 * self.c
+
+        return self.offsetX, self.offsetA_c, (self.offsetA_c + cutLength_c) % self.c, cutLength_c, cutSpace_c
+
+    def _generate(self):
+        # Grown by the loop below for variableCutLength, so start afresh on every run
+        x, y_start, y_end, self.cutLength_c, self.cutSpace_c = self._start()
 
-        x = self.offsetX
-        y_start = self.offsetA_c
-        y_end = (y_start + self.cutLength_c) % self.c
+        self.segments = Segments()
 
+        if self.vectorized:
+            # Same geometry as the loop below, computed for the whole grid of cuts at once
+            segments, self.cutLength_c, self.cutSpace_c, _ = _brickArrays(self.c, x, y_start, y_end, self.cutLength_c, self.cutSpace_c, self.cutIncrease_c, self.spacingA_c, self.numRadialCuts, self.pitch, self.variableCutLength, self.continuous, self.instances)
+            self.segments = Segments(segments)
+
+            if (self.variablePitch):
+                print("TBD")
+            return
+
+        # Scalar reference implementation
         for i in range(0, self.instances):
             for j in range(0, self.numRadialCuts):
 
                 if y_start > y_end:
-                    self.lines.append(((x, y_start), (x, self.c)))
+                    self.segments.append((x, y_start), (x, self.c))
                     y_start = 0
                 
-                self.lines.append(((x, y_start), (x, y_end)))
+                self.segments.append((x, y_start), (x, y_end))
 
                 y_start = y_end + self.cutSpace_c
                 y_end = y_start + self.cutLength_c
@@ -244,6 +1813,27 @@ class CutBrick:
             if (self.variablePitch):
                 print("TBD")
     
+    def _iterGenerate(self, chunkSize):
+        # Up to two segments per cut, numRadialCuts cuts per instance
+        x, y_start, y_end, cutLength_c, cutSpace_c = self._start()
+
+        row = None
+        for _, n in self._chunks(chunkSize, 2 * self.numRadialCuts):
+            segments, cutLength_c, cutSpace_c, row = _brickArrays(self.c, x, y_start, y_end, cutLength_c, cutSpace_c, self.cutIncrease_c, self.spacingA_c, self.numRadialCuts, self.pitch, self.variableCutLength, self.continuous, n, row)
+            yield segments
+
+    def _sweepKey(self):
+        return None if self.instances is None else (type(self), self.instances, self.numRadialCuts, self.variableCutLength, self.continuous)
+
+    @staticmethod
+    def _sweepGroup(cuts):
+        x, y_start, y_end, cutLength_c, cutSpace_c = (np.array(column) for column in zip(*(cut._start() for cut in cuts)))
+        first = cuts[0]
+        segments, keep, _, _, row = _brickGrid(np.array([cut.c for cut in cuts]), x, y_start, y_end, cutLength_c, cutSpace_c,
+                                               np.array([cut.cutIncrease_c for cut in cuts]), np.array([cut.spacingA_c for cut in cuts]), first.numRadialCuts,
+                                               np.array([cut.pitch for cut in cuts]), first.variableCutLength, first.continuous, first.instances)
+        return segments, keep, row[0]
+
     def dumpConfig(self):
         return {
             'type': self.type,
@@ -261,25 +1851,23 @@ class CutBrick:
             'continuous': self.continuous,
         }
 
-    def plot(self):
-        for start, end in self.lines:
-            plt.plot([start[0], end[0]], [start[1], end[1]])
-
     def draw(self, doc):
         msp = doc.modelspace()
 
-        for start, end in self.lines:
-            msp.add_line(start, end, dxfattribs={"layer": "MyLayer"})
-            # print("start: ", start)
-            # print("end ", end, "\n")
+        return [msp.add_line((x0, y0), (x1, y1), dxfattribs={"layer": "MyLayer"}) for x0, y0, x1, y1 in self.segments.array.tolist()]
     
-class CutPartline:
-    def __init__(self, OD, offsetX = 0):
+class CutPartline(_Cut):
+    def __init__(self, OD, offsetX = 0, lazy=False):
         self.type = 'CutPartline'
         self.OD = OD
         self.c = OD * pi
         self.offsetX = offsetX
-        self.lines = [((self.offsetX, 0), (self.offsetX, self.c))]
+
+        if not lazy:
+            self.generate()
+
+    def _generate(self):
+        self.segments = Segments([[self.offsetX, 0, self.offsetX, self.c]])
     
     def dumpConfig(self):
         return {
@@ -288,37 +1876,821 @@ class CutPartline:
             'offsetX': self.offsetX,
         }
 
-    def plot(self):
-        for start, end in self.lines:
-            plt.plot([start[0], end[0]], [start[1], end[1]])
-
     def draw(self, doc):
         msp = doc.modelspace()
 
-        for start, end in self.lines:
-            msp.add_line(start, end, dxfattribs={"layer": "MyLayer"})
+        return [msp.add_line((x0, y0), (x1, y1), dxfattribs={"layer": "MyLayer"}) for x0, y0, x1, y1 in self.segments.array.tolist()]
+
+CUT_TYPES = {cutType.__name__: cutType for cutType in (CutSpiral, CutBrick, CutPartline)}
+
+def _generateCut(cut):
+    # Process pool worker for CutPattern.generate()
+    start = perf_counter()
+    cut._generate()
+    return cut.segments.array, cut._state(), perf_counter() - start
+
+# Binary DXF (R12): one byte group codes, then the value as a little endian
+# double (codes 10-59), 16 bit int (60-79) or null terminated string
+DXF_BINARY_SENTINEL = b'AutoCAD Binary DXF\r\n\x1a\x00'
+
+def _dxfBinary(tags):
+    # Binary encoding of the '  code\nvalue\n' pairs of an ASCII DXF snippet
+    lines = tags.split('\n')
+    encoded = bytearray()
+    for code, value in zip(lines[0::2], lines[1::2]):
+        code = int(code)
+        encoded.append(code)
+        if 10 <= code < 60:
+            encoded += struct.pack('<d', float(value))
+        elif 60 <= code < 80:
+            encoded += struct.pack('<h', int(value))
+        else:
+            encoded += value.encode('cp1252') + b'\0'
+    return bytes(encoded)
+
+def _dxfRecord(template):
+    '''
+    A packed record holding the binary encoding of an ASCII DXF template
+    whose %r values are doubles.  The constant bytes are filled in, the
+    doubles left to fields 'v0', 'v1', ... in template order.
+    '''
+    fields, constants, pending = [], {}, b''
+    lines = template.split('\n')
+    for code, value in zip(lines[0::2], lines[1::2]):
+        if value == '%r':
+            constants[f'c{len(constants)}'] = pending + bytes([int(code)])
+            fields += [(f'c{len(constants) - 1}', np.uint8, len(pending) + 1), (f'v{len(constants) - 1}', '<f8')]
+            pending = b''
+        else:
+            pending += _dxfBinary(f'{code}\n{value}\n')
+    if pending:
+        constants[f'c{len(constants)}'] = pending
+        fields.append((f'c{len(constants) - 1}', np.uint8, len(pending)))
+
+    record = np.zeros(1, dtype=np.dtype(fields))
+    for name, value in constants.items():
+        record[name] = np.frombuffer(value, dtype=np.uint8)
+    return record
+
+class DxfStreamWriter:
+    '''
+    Writes a DXF (R12) straight to a file handle without building an ezdxf
+    document.  Entities are formatted a chunk of segments at a time so memory
+    use stays flat however large the pattern is.
+
+        with DxfStreamWriter(f) as writer:
+            writer.addLines(segments)
+
+    `blocks` maps block names to the (N, 4) segments they are made of, written
+    up front so addInsert() can place them.  With `binary` the stream (opened
+    'wb') gets a binary DXF instead, coordinates written as the raw doubles.
+    '''
+    HEADER = (
+        '  0\nSECTION\n  2\nHEADER\n'
+        '  9\n$ACADVER\n  1\nAC1009\n'
+        '  9\n$INSUNITS\n 70\n4\n'
+        '  0\nENDSEC\n'
+        '  0\nSECTION\n  2\nTABLES\n'
+        '  0\nTABLE\n  2\nLTYPE\n 70\n1\n'
+        '  0\nLTYPE\n  2\nCONTINUOUS\n 70\n0\n  3\nSolid line\n 72\n65\n 73\n0\n 40\n0.0\n'
+        '  0\nENDTAB\n'
+        '  0\nTABLE\n  2\nLAYER\n 70\n2\n'
+        '  0\nLAYER\n  2\n0\n 70\n0\n 62\n7\n  6\nCONTINUOUS\n'
+        '  0\nLAYER\n  2\n{layer}\n 70\n0\n 62\n7\n  6\nCONTINUOUS\n'
+        '  0\nENDTAB\n'
+        '  0\nENDSEC\n'
+    )
+    ENTITIES = '  0\nSECTION\n  2\nENTITIES\n'
+    FOOTER = '  0\nENDSEC\n  0\nEOF\n'
+
+    # Coordinates are written with %r (shortest repr) so they read back bit-exact
+    LINE = '  0\nLINE\n  8\n{layer}\n 10\n%r\n 20\n%r\n 30\n0.0\n 11\n%r\n 21\n%r\n 31\n0.0\n'
+    POLYLINE = '  0\nPOLYLINE\n  8\n{layer}\n 66\n1\n 10\n0.0\n 20\n0.0\n 30\n0.0\n 70\n0\n'
+    VERTEX = '  0\nVERTEX\n  8\n{layer}\n 10\n%r\n 20\n%r\n 30\n0.0\n'
+    SEQEND = '  0\nSEQEND\n  8\n{layer}\n'
+    BLOCK = '  0\nBLOCK\n  8\n0\n  2\n{name}\n 70\n0\n 10\n0.0\n 20\n0.0\n 30\n0.0\n  3\n{name}\n'
+    ENDBLK = '  0\nENDBLK\n  8\n0\n'
+    INSERT = '  0\nINSERT\n  8\n{layer}\n  2\n{name}\n 10\n{x!r}\n 20\n{y!r}\n 30\n0.0\n'
+    ARRAY = ' 70\n{columns}\n 71\n{rows}\n 44\n{columnSpacing!r}\n 45\n{rowSpacing!r}\n'
+
+    def __init__(self, stream, layer='MyLayer', chunkSize=65536, blocks=None, binary=False):
+        self._stream = stream
+        self.chunkSize = chunkSize
+        self.binary = binary
+        self.entities = 0
+
+        if binary:
+            # LINE and VERTEX records only differ in their doubles
+            self._lineRecord = _dxfRecord(self.LINE.format(layer=layer))
+            self._vertexRecord = _dxfRecord(self.VERTEX.format(layer=layer))
+            self._stream.write(DXF_BINARY_SENTINEL)
+        else:
+            self._line = self.LINE.format(layer=layer.replace('%', '%%'))
+            self._vertex = self.VERTEX.format(layer=layer.replace('%', '%%'))
+        self._polyline = self._encode(self.POLYLINE.format(layer=layer))
+        self._seqend = self._encode(self.SEQEND.format(layer=layer))
+        self._layer = layer
+
+        self._write(self.HEADER.format(layer=layer))
+        if blocks:
+            self._write('  0\nSECTION\n  2\nBLOCKS\n')
+            for name, segments in blocks.items():
+                self._write(self.BLOCK.format(name=name))
+                self.addLines(segments)
+                self._write(self.ENDBLK)
+            self._write('  0\nENDSEC\n')
+            self.entities = 0
+        self._write(self.ENTITIES)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _encode(self, tags):
+        return _dxfBinary(tags) if self.binary else tags
+
+    def _write(self, tags):
+        self._stream.write(self._encode(tags))
+
+    @staticmethod
+    def _fill(record, chunk):
+        # Binary records for a chunk of rows, one double field per column
+        records = np.repeat(record, len(chunk))
+        for k in range(chunk.shape[1]):
+            records[f'v{k}'] = chunk[:, k]
+        return records.tobytes()
+
+    def addLines(self, segments):
+        # One LINE per [x_start, y_start, x_end, y_end] row
+        segments = np.asarray(segments, dtype=np.float64).reshape(-1, 4)
+
+        for i in range(0, len(segments), self.chunkSize):
+            chunk = segments[i:i + self.chunkSize]
+            if self.binary:
+                self._stream.write(self._fill(self._lineRecord, chunk))
+            else:
+                self._stream.write((self._line * len(chunk)) % tuple(chunk.ravel().tolist()))
+            self.entities += len(chunk)
+
+    def addPolyline(self, vertices):
+        # Open polyline through an (N, 2) array of vertices
+        vertices = np.asarray(vertices, dtype=np.float64).reshape(-1, 2)
+
+        self._stream.write(self._polyline)
+        for i in range(0, len(vertices), self.chunkSize):
+            chunk = vertices[i:i + self.chunkSize]
+            if self.binary:
+                self._stream.write(self._fill(self._vertexRecord, chunk))
+            else:
+                self._stream.write((self._vertex * len(chunk)) % tuple(chunk.ravel().tolist()))
+        self._stream.write(self._seqend)
+        self.entities += 1
+
+    def addInsert(self, name, x=0.0, y=0.0, columns=1, rows=1, columnSpacing=0.0, rowSpacing=0.0):
+        # Reference a block, as a columns x rows array of it if either is more than one
+        self._write(self.INSERT.format(layer=self._layer, name=name, x=float(x), y=float(y)))
+        if columns > 1 or rows > 1:
+            self._write(self.ARRAY.format(columns=columns, rows=rows, columnSpacing=float(columnSpacing), rowSpacing=float(rowSpacing)))
+        self.entities += 1
+
+    def close(self):
+        if self._stream is not None:
+            self._write(self.FOOTER)
+            self._stream = None
+
+# Templates for GcodeStreamWriter.  `rapid` and `cut` are formatted with the
+# {X} and {A} coordinates of the move's end, `cut` also with its inverse time
+# {F} (G93: 1 / minutes), everything else with the writer's power and
+# pierceTime (s) and the job name
+GCODE_DIALECTS = {
+    'grbl': {
+        'header': '; {name}\nG21 G90 G93\nM5\n',
+        'rapid': 'G0 X{X} A{A}\n',
+        'laserOn': 'M3 S{power:g}\nG4 P{pierceTime:g}\n',
+        'cut': 'G1 X{X} A{A} F{F}\n',
+        'laserOff': 'M5\n',
+        'footer': 'M2\n',
+    },
+    'linuxcnc': {
+        'header': '%\n({name})\nG21 G90 G93 G64 P0.01\nM5\n',
+        'rapid': 'G0 X{X} A{A}\n',
+        'laserOn': 'M3 S{power:g}\nG4 P{pierceTime:g}\n',
+        'cut': 'G1 X{X} A{A} F{F}\n',
+        'laserOff': 'M5\n',
+        'footer': 'M2\n%\n',
+    },
+    'fanuc': {
+        'header': '%\nO1000 ({name})\nG21 G90 G93\nM5\n',
+        'rapid': 'G00 X{X} A{A}\n',
+        'laserOn': 'M03 S{power:g}\nG04 X{pierceTime:g}\n',
+        'cut': 'G01 X{X} A{A} F{F}\n',
+        'laserOff': 'M05\n',
+        'footer': 'M30\n%\n',
+    },
+}
+
+class GcodeStreamWriter:
+    '''
+    Writes X/A G-code for a rotary laser straight to a file handle, a chunk of
+    segments at a time.  Unrolled y is turned into A axis degrees with the
+    circumference of the tube each segment is cut on.  `dialect` is a key of
+    GCODE_DIALECTS or a dict of the same templates.
+
+    Cuts are programmed in inverse time (G93), as a feed would otherwise be
+    applied to X mm and A degrees alike: each move takes its surface length at
+    `feed` (mm/min), or longer if A would turn faster than `angularVelocity`
+    (deg/min, no limit if None).
+
+        with GcodeStreamWriter(f, 'grbl', feed=1200) as writer:
+            writer.addChains(segments, breaks, c)
+    '''
+    def __init__(self, stream, dialect='grbl', feed=1200, power=1000, pierceTime=0.2, name=SOFTWARE_NAME, digits=4, chunkSize=65536, angularVelocity=None):
+        self._stream = stream
+        self.chunkSize = chunkSize
+        self.feed = feed
+        self.angularVelocity = angularVelocity
+        self.moves = 0
+        self.pierces = 0
+        self._a = None
+
+        templates = GCODE_DIALECTS[dialect] if isinstance(dialect, str) else dialect
+        params = {'feed': feed, 'power': power, 'pierceTime': pierceTime, 'name': name}
+        coordinate = f'%.{digits}f'
+        rapid = templates['rapid'].format(X=coordinate, A=coordinate)
+        cut = templates['cut'].format(X=coordinate, A=coordinate, F='%.6g')
+        laserOn, laserOff = (templates[key].format(**params).replace('%', '%%') for key in ('laserOn', 'laserOff'))
+        self._footer = templates['footer'].format(**params)
+
+        # Row templates indexed by 2 * (starts a chain) + (ends a chain)
+        self._rows = [cut, cut + laserOff, rapid + laserOn + cut, rapid + laserOn + cut + laserOff]
+
+        self._stream.write(templates['header'].format(**params))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def addChains(self, segments, breaks, c, tol=PRECISION):
+        '''
+        Cut the chains of (N, 4) `segments` split at `breaks` (see
+        _chainBreaks) in order, rapiding to the start of each.  `c` is the
+        circumference, one for all segments or one per segment.  A keeps
+        counting past 360 so every rapid takes the shorter way round, and a
+        chain that carries on across the seam is cut without a new pierce.
+        '''
+        segments = np.asarray(segments, dtype=np.float64).reshape(-1, 4)
+        if not len(segments):
+            return
+        c = np.broadcast_to(np.asarray(c, dtype=np.float64), len(segments))
+        starts, ends = breaks[:-1], breaks[1:] - 1
+
+        a = segments[:, [1, 3]] / c[:, None] * 360
+
+        # Turns added to each chain: the start is moved within half a turn of where A was left
+        previous = np.r_[a[0, 0] if self._a is None else self._a, a[ends[:-1], 1]]
+        turns = np.cumsum(np.round((previous - a[starts, 0]) / 360))
+        a += np.repeat(turns * 360, np.diff(breaks))[:, None]
+
+        # Chains that meet on the tube are continued rather than pierced again
+        continued = _seamContinued(segments, breaks, c, tol)
+        isStart = np.zeros(len(segments), dtype=bool)
+        isStart[starts[~continued]] = True
+        isEnd = np.zeros(len(segments), dtype=bool)
+        isEnd[ends[np.r_[~continued[1:], True]]] = True
+
+        # Minutes per move at feed along the surface, or at angularVelocity if A is the slower axis
+        minutes = np.hypot(segments[:, 2] - segments[:, 0], segments[:, 3] - segments[:, 1]) / self.feed
+        if self.angularVelocity is not None:
+            minutes = np.maximum(minutes, np.abs(a[:, 1] - a[:, 0]) / self.angularVelocity)
+        inverseTime = 1 / np.maximum(minutes, 1e-9)
+
+        values = np.column_stack((segments[:, 0], a[:, 0], segments[:, 2], a[:, 1], inverseTime))
+        kinds = 2 * isStart + isEnd
+        rows = np.array(self._rows, dtype=object)
+
+        for i in range(0, len(segments), self.chunkSize):
+            chunk = slice(i, i + self.chunkSize)
+            mask = np.column_stack((isStart[chunk], isStart[chunk], np.ones((len(values[chunk]), 3), dtype=bool)))
+            self._stream.write(''.join(rows[kinds[chunk]].tolist()) % tuple(values[chunk][mask].tolist()))
+
+        self.moves += len(segments) + int(isStart.sum())
+        self.pierces += int(isStart.sum())
+        self._a = a[-1, 1]
+
+    def close(self):
+        if self._stream is not None:
+            self._stream.write(self._footer)
+            self._stream = None
+
+def _seamContinued(segments, breaks, c, tol=PRECISION):
+    '''
+    Which chains of (N, 4) `segments` split at `breaks` (see _chainBreaks)
+    start where the chain before them ends once y is taken around the tube of
+    circumference `c` (one for all segments or one per segment).  The laser
+    carries on across the seam into those without a pierce or a rapid.
+    '''
+    c = np.broadcast_to(np.asarray(c, dtype=np.float64), len(segments))
+    starts = breaks[1:-1]
+    dy = np.abs(segments[starts, 1] - segments[starts - 1, 3]) % c[starts]
+    dy = np.minimum(dy, c[starts] - dy)
+    return np.r_[False, (dy <= tol) & (np.abs(segments[starts, 0] - segments[starts - 1, 2]) <= tol)]
+
+def _moveTime(distance, speed, acceleration):
+    # Point to point move time with a trapezoidal (or triangular, if short) speed profile
+    return np.where(distance >= speed ** 2 / acceleration, distance / speed + speed / acceleration, 2 * np.sqrt(distance / acceleration))
+
+class MachineProfile:
+    '''
+    Motion settings of a rotary laser for CutPattern.estimate(), all per
+    second: cutting `feed` (mm/s) along the path, A axis `angularVelocity`
+    (deg/s) while cutting, `acceleration` (mm/s^2, of the tube surface for
+    A), `pierceTime` (s) and rapid speeds `rapidX` (mm/s) and `rapidA`
+    (deg/s).
+    '''
+    def __init__(self, feed=20, angularVelocity=360, acceleration=1000, pierceTime=0.2, rapidX=200, rapidA=1080):
+        self.feed = feed
+        self.angularVelocity = angularVelocity
+        self.acceleration = acceleration
+        self.pierceTime = pierceTime
+        self.rapidX = rapidX
+        self.rapidA = rapidA
 
 class CutPattern:
     def __init__(self):
         self._cuts = []
-        self._dxf = ezdxf.new()
-        self._dxf.units = units.MM
+        self._doc = None
+        self._drawn = []
+        self._drawnBlocks = None
+        self._order = None
+
+    @property
+    def _dxf(self):
+        # The ezdxf document is only created once something is drawn
+        if self._doc is None:
+            import ezdxf
+            from ezdxf import units
+
+            self._doc = ezdxf.new()
+            self._doc.units = units.MM
+        return self._doc
 
     def add(self, cut):
         self._cuts.append(cut)
+        self._order = None
 
     def remove(self, cutIdx):
         self._cuts.pop(cutIdx)
+        self._order = None
+
+    def draw(self, polylines=False, blocks=False, blockTol=PRECISION):
+        '''
+        Add the cuts to the DXF document.  With polylines=True, runs of
+        connected segments (across all cuts) are added as one LWPOLYLINE each
+        instead of one LINE per segment.  Returns the number of entities saved
+        by merging.
+
+        With blocks=True, sections of a cut that repeat (brick rows, spiral
+        turns) are added as a BLOCK and an INSERT array of it, copies within
+        `blockTol` of the segments they stand for.  Leave it off (flat LINEs)
+        for controllers that don't read blocks.
+
+        The document keeps track of which entities belong to which cut, so
+        calling draw() again only adds cuts added since and deletes the
+        entities of cuts removed since.  Polylines and optimized orders run
+        across cuts, so those are always redrawn in full.
+        '''
+        msp = self._dxf.modelspace()
+        self.generate()
+
+        if blocks and (polylines or self._order is not None):
+            raise ValueError('blocks cannot be combined with polylines or an optimized order')
+
+        # Switching between blocks and flat LINEs (or the tolerance) redraws everything
+        mode = blockTol if blocks else None
+        if mode != self._drawnBlocks:
+            self._erase(self._drawn)
+            self._drawn = []
+            self._drawnBlocks = mode
+
+        if polylines or self._order is not None:
+            self._erase(self._drawn)
+            with _span('draw', 'pattern') as span:
+                entities, merged = self._drawChains(msp, polylines)
+                span.segments = len(entities) + merged
+                span.entities = len(entities)
+            self._drawn = [(None, entities)]
+            return merged
+
+        # Match what is already drawn against the current cuts, whatever is
+        # left over on either side is new or has been removed
+        pending = list(self._cuts)
+        drawn, removed = [], []
+        for cut, entities in self._drawn:
+            for i, other in enumerate(pending):
+                if other is cut:
+                    drawn.append((cut, entities))
+                    pending.pop(i)
+                    break
+            else:
+                removed.append((cut, entities))
+
+        self._erase(removed)
+        for cut in pending:
+            with _span('draw', self._label(cut)) as span:
+                entities = self._drawBlocks(cut, blockTol) if blocks else cut.draw(self._dxf)
+                span.segments = len(cut.segments)
+                span.entities = len(entities)
+            drawn.append((cut, entities))
+        self._drawn = drawn
+
+        return 0
+
+    def _drawChains(self, msp, polylines):
+        # Draw the whole pattern in export order, returns the entities and how many were merged
+        segments, breaks = self._exportSegments()
+        entities = []
+
+        if not polylines:
+            for x0, y0, x1, y1 in segments.tolist():
+                entities.append(msp.add_line((x0, y0), (x1, y1), dxfattribs={"layer": "MyLayer"}))
+            return entities, 0
+
+        for start, end in zip(breaks[:-1], breaks[1:]):
+            if end - start == 1:
+                x0, y0, x1, y1 = segments[start].tolist()
+                entities.append(msp.add_line((x0, y0), (x1, y1), dxfattribs={"layer": "MyLayer"}))
+            else:
+                entities.append(msp.add_lwpolyline(_chainVertices(segments, start, end).tolist(), dxfattribs={"layer": "MyLayer"}))
+
+        return entities, len(segments) - (len(breaks) - 1)
+
+    def _blockPieces(self, cut, tol):
+        # Split a cut into (segments, None) to write as LINEs and (block segments, inserts) to write as a block
+        segments = cut.segments.array
+        i = 0
+        for start, period, reps, dx, dy in _periodicSections(segments, cut.c, tol):
+            if start > i:
+                yield segments[i:start], None
+            yield segments[start:start + period], _inserts(reps, dx, dy)
+            i = start + period * reps
+        if i < len(segments) or not i:
+            yield segments[i:], None
+
+    def _drawBlocks(self, cut, tol):
+        # Draw a cut with its repeating sections as blocks, returns the entities
+        msp = self._dxf.modelspace()
+        entities = []
+        for segments, inserts in self._blockPieces(cut, tol):
+            if inserts is None:
+                entities += [msp.add_line((x0, y0), (x1, y1), dxfattribs={"layer": "MyLayer"}) for x0, y0, x1, y1 in segments.tolist()]
+                continue
+
+            k = len(self._dxf.blocks)
+            while f'CUT{k}' in self._dxf.blocks:
+                k += 1
+            block = self._dxf.blocks.new(f'CUT{k}')
+            for x0, y0, x1, y1 in segments.tolist():
+                block.add_line((x0, y0), (x1, y1), dxfattribs={"layer": "MyLayer"})
+            for x, y, columns, rows, columnSpacing, rowSpacing in inserts:
+                entities.append(msp.add_blockref(block.name, (x, y), dxfattribs={
+                    "layer": "MyLayer", "column_count": columns, "row_count": rows, "column_spacing": columnSpacing, "row_spacing": rowSpacing}))
+
+        return entities
 
-    def draw(self):
+    def _label(self, cut):
+        # Cut number as printCutTable() shows it
+        for i, other in enumerate(self._cuts):
+            if other is cut:
+                return f'#{i + 1} {cut.type}'
+        return cut.type
+
+    def _erase(self, drawn):
+        # Delete (cut, entities) pairs from the document.  Entities are dropped
+        # from the database one by one and the modelspace purged once at the end.
+        db = self._dxf.entitydb
+        deleted = False
+        blocks = set()
+        for cut, entities in drawn:
+            for entity in entities:
+                if entity.dxftype() == 'INSERT':
+                    blocks.add(entity.dxf.name)
+                db.delete_entity(entity)
+                deleted = True
+
+        if deleted:
+            self._dxf.modelspace().purge()
+        for name in blocks:
+            self._dxf.blocks.delete_block(name, safe=False)
+
+    def optimizeOrder(self, window=50, passes=5):
+        '''
+        Reorder (and reverse where useful) the connected runs of segments so the
+        laser travels less between them: a nearest neighbour tour followed by a
+        bounded 2-opt pass.  The order is used by draw() and save() until a cut
+        is added or removed.  Returns the rapid travel before and after.
+        '''
+        self._order = None
+        segments, breaks = self._exportSegments()
+        starts = segments[breaks[:-1], :2]
+        ends = segments[breaks[1:] - 1, 2:]
+        c = self._circumference()
+
+        before = float(_travel(ends[:-1], starts[1:], c).sum())
+
+        order, flipped = _nearestNeighbourOrder(starts, ends, c)
+        order, flipped = _twoOpt(starts, ends, order, flipped, c, window, passes)
+
+        s = np.where(flipped[:, None], ends[order], starts[order])
+        e = np.where(flipped[:, None], starts[order], ends[order])
+        after = float(_travel(e[:-1], s[1:], c).sum())
+
+        if after < before:
+            self._order = (order, flipped)
+        else:
+            after = before
+
+        return before, after
+
+    def findOverlaps(self, tol=PRECISION, gap=0.01):
+        '''
+        Look for places the laser would cut twice: duplicate segments,
+        collinear segments overlapping each other and endpoints of different
+        segments closer than `gap` without meeting, e.g. where one section
+        starts on the last row of the one before.  Segment indices refer to
+        segments().  See mergeOverlaps() to fix them.
+        '''
+        return _findOverlaps(self.segments().array, self._circumference(), tol, gap)
+
+    def mergeOverlaps(self, tol=PRECISION, gap=0.01):
+        '''
+        Fix what findOverlaps() finds in the cuts themselves: duplicates are
+        dropped, each run of overlapping collinear segments becomes a single
+        segment (kept by the cut owning the first of them) and endpoints
+        within `gap` of each other are snapped together.  Returns how many of
+        each were fixed.
+        '''
+        self.generate()
+        # A cut added twice is still only fixed once
+        cuts = list({id(cut): cut for cut in self._cuts}.values())
+        parts = [cut.segments.array for cut in cuts]
+        owner = np.repeat(np.arange(len(cuts)), [len(part) for part in parts])
+        segments = np.concatenate(parts) if parts else np.empty((0, 4))
+        c = self._circumference()
+
+        report = _findOverlaps(segments, c, tol, gap)
+        keep = np.ones(len(segments), dtype=bool)
+        keep[report['duplicates'][:, 1]] = False
+
+        # Sweep each line again for the runs of overlapping segments
+        shifted, order, t0, t1, newLine = _lineRuns(segments, c, tol)
+        line = np.cumsum(newLine)
+        used = keep[order] & (t1 - t0 > tol)
+        order, t0, t1, line = order[used], t0[used], t1[used], line[used]
+        newLine = np.r_[True, line[1:] != line[:-1]]
+
+        runMax = _runningMax(t1, newLine)[0]
+        run = np.cumsum(newLine | (t0 >= np.r_[-np.inf, runMax[:-1]] - tol)) - 1
+        starts = np.flatnonzero(np.r_[True, run[1:] != run[:-1]])
+        sizes = np.diff(np.r_[starts, len(run)])
+        merged = sizes > 1
+
+        if merged.any():
+            furthest = np.lexsort((t1, run))[np.r_[starts[1:], len(run)] - 1]
+            first = np.minimum.reduceat(order, starts)
+            turns = (np.minimum(segments[:, 1], segments[:, 3]) // c) * c if c else np.zeros(len(segments))
+            dx, dy = segments[:, 2] - segments[:, 0], segments[:, 3] - segments[:, 1]
+            backward = (dx < 0) | ((dx == 0) & (dy < 0))
+
+            keep[order[np.repeat(merged, sizes)]] = False
+            first, spanStart, spanEnd = first[merged], order[starts[merged]], order[furthest[merged]]
+            line = np.concatenate([shifted[spanStart, :2], shifted[spanEnd, 2:]], axis=1)
+            line[:, 1::2] += turns[first][:, None]
+            line[backward[first]] = line[backward[first]][:, [2, 3, 0, 1]]
+            segments[first] = line
+            keep[first] = True
+
+        segments, owner = segments[keep], owner[keep]
+
+        # Snap the near misses of what is left
+        snapped = _findOverlaps(segments, c, tol, gap)
+        points = segments.reshape(-1, 2)
+        pa = snapped['gaps'][:, 0] * 2 + snapped['gapEnds'][:, 0]
+        pb = snapped['gaps'][:, 1] * 2 + snapped['gapEnds'][:, 1]
+        delta = points[pa] - points[pb]
+        if c:
+            delta[:, 1] = (delta[:, 1] + c / 2) % c - c / 2
+        points[pb] += delta
+
+        for i, cut in enumerate(cuts):
+            cut.segments = Segments(segments[owner == i])
+
+        # The geometry changed under the cuts, so draw everything afresh
+        self._order = None
+        if self._drawn:
+            self._erase(self._drawn)
+            self._drawn = []
+
+        return {'duplicates': len(report['duplicates']), 'overlaps': int(sizes[merged].sum() - merged.sum()), 'gaps': len(pa)}
+
+    def checkStruts(self, minWidth, tol=PRECISION):
+        '''
+        Find struts narrower than `minWidth` (e.g. kerf plus minimum
+        material): pairs of segments, from any cuts, that come closer than
+        that without touching, measured around the tube.  Returns a dict with
+        'pairs' (k, 2) of segment indices into segments(), their 'distance'
+        and the closest 'points' (k, 4) on each, narrowest first, and the
+        narrowest width found as 'minimum' (None when there are none).
+        '''
+        report = _strutViolations(self.segments().array, self._circumference(), minWidth, tol)
+        report['minimum'] = float(report['distance'][0]) if len(report['distance']) else None
+        return report
+
+    def _circumference(self):
+        # Tube circumference used to wrap travel around A (from the first cut)
         for cut in self._cuts:
-            cut.draw(self._dxf)
+            return cut.c
+        return None
+
+    def _circumferences(self):
+        # Circumference of the tube each segment is cut on
+        self.generate()
+        return np.repeat(np.array([cut.c for cut in self._cuts], dtype=np.float64), [len(cut.segments) for cut in self._cuts])
+
+    def _exportSegments(self, perSegment=None):
+        '''
+        All segments in the order they are exported along with the chain breaks
+        (see _chainBreaks), with the optimized order applied if there is one.
+        An array of per segment values passed as `perSegment` is reordered the
+        same way and returned third.
+        '''
+        segments = self.segments().array
+        breaks = _chainBreaks(segments)
+
+        if self._order is None:
+            return (segments, breaks) if perSegment is None else (segments, breaks, perSegment)
+
+        order, flipped = self._order
+        lengths = np.diff(breaks)[order]
+
+        # Row indices of each chain in the new order, walked backwards for reversed chains
+        offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        flip = np.repeat(flipped, lengths)
+        rows = np.repeat(breaks[:-1][order], lengths) + np.where(flip, np.repeat(lengths, lengths) - 1 - offsets, offsets)
+
+        segments = segments[rows]
+        segments[flip] = segments[flip][:, [2, 3, 0, 1]]
+        breaks = np.r_[0, np.cumsum(lengths)]
+
+        return (segments, breaks) if perSegment is None else (segments, breaks, perSegment[rows])
 
-    def save(self, filename):
-        # Save DXF
-        self._dxf.saveas(f'./output/{filename}.dxf')
+    def estimate(self, machine=None):
+        '''
+        Estimate the time to cut the pattern on `machine` (a MachineProfile,
+        default settings if None) in the order it is exported.  Every chain of
+        connected segments, carried on across the seam as saveGcode() cuts
+        it, is one pierce and one accelerated move at the slowest speed its
+        segments allow; the laser rapids from the end of
+        each chain to the start of the next, X and A moving together and A
+        taking the shorter way round.  Returns a dict of cutLength,
+        rapidLength (mm), pierces and cutTime, pierceTime, rapidTime and
+        cycleTime (s).
+        '''
+        machine = machine or MachineProfile()
+        segments, breaks, c = self._exportSegments(self._circumferences())
+        if len(segments):
+            breaks = np.delete(breaks, np.flatnonzero(_seamContinued(segments, breaks, c)))
+        starts, ends = breaks[:-1], breaks[1:]
+
+        # Surface speed is capped by the A axis on steep segments
+        dx = np.abs(segments[:, 2] - segments[:, 0])
+        dy = np.abs(segments[:, 3] - segments[:, 1])
+        length = np.hypot(dx, dy)
+        speed = np.minimum(machine.feed, np.where(dy > 0, machine.angularVelocity / 360 * c * length / np.where(dy > 0, dy, 1), np.inf))
+
+        cutTime = 0.0
+        if len(starts):
+            chainLength = np.add.reduceat(length, starts)
+            chainSpeed = np.minimum.reduceat(speed, starts)
+            # Time at speed plus the ramps at either end, or a triangle profile when too short to reach it
+            atSpeed = np.add.reduceat(length / speed, starts)
+            ramped = np.where(chainLength >= chainSpeed ** 2 / machine.acceleration,
+                              atSpeed + chainSpeed / machine.acceleration,
+                              2 * np.sqrt(chainLength / machine.acceleration))
+            cutTime = float(ramped.sum())
+
+        # Rapids between chains, A measured on the tube being cut next
+        a, b = segments[ends[:-1] - 1, 2:], segments[starts[1:], :2]
+        nextC = c[starts[1:]]
+        rapidX = np.abs(b[:, 0] - a[:, 0])
+        rapidY = np.abs(b[:, 1] - a[:, 1]) % nextC
+        rapidY = np.minimum(rapidY, nextC - rapidY)
+        rapidA = rapidY / nextC * 360
+        rapidTime = np.maximum(_moveTime(rapidX, machine.rapidX, machine.acceleration),
+                               _moveTime(rapidA, machine.rapidA, machine.acceleration / nextC * 360))
+
+        pierces = len(starts)
+        return {
+            'cutLength': float(length.sum()),
+            'pierces': pierces,
+            'rapidLength': float(np.hypot(rapidX, rapidY).sum()),
+            'cutTime': cutTime,
+            'pierceTime': pierces * machine.pierceTime,
+            'rapidTime': float(rapidTime.sum()),
+            'cycleTime': cutTime + pierces * machine.pierceTime + float(rapidTime.sum()),
+        }
+
+    def save(self, filename, streaming=False, polylines=False, blocks=False, blockTol=PRECISION, binary=False, outputDir='./output'):
+        # Save DXF, binary rather than ASCII if asked (same .dxf extension)
+        merged = 0
+        if streaming:
+            self.generate()
+            if blocks and (polylines or self._order is not None):
+                raise ValueError('blocks cannot be combined with polylines or an optimized order')
+
+            # Blocks have to be written ahead of the entities that insert them
+            pieces, definitions = [], {}
+            if blocks:
+                for cut in self._cuts:
+                    for segments, inserts in self._blockPieces(cut, blockTol):
+                        if inserts is not None:
+                            name = f'CUT{len(definitions)}'
+                            definitions[name] = segments
+                            pieces.append((name, inserts))
+                        else:
+                            pieces.append((None, segments))
+
+            # Write the cuts' segments straight to file, no need to draw() first
+            with _span('saveas', filename) as span, open(f'{outputDir}/{filename}.dxf', 'wb' if binary else 'w') as f, \
+                    DxfStreamWriter(f, blocks=definitions, binary=binary) as writer:
+                if blocks:
+                    for name, piece in pieces:
+                        if name is None:
+                            writer.addLines(piece)
+                        else:
+                            for x, y, columns, rows, columnSpacing, rowSpacing in piece:
+                                writer.addInsert(name, x, y, columns, rows, columnSpacing, rowSpacing)
+                elif polylines:
+                    segments, breaks = self._exportSegments()
+
+                    # Everything between two chains is lone segments, written as a batch of LINEs
+                    i = 0
+                    for k in np.flatnonzero(np.diff(breaks) > 1).tolist():
+                        writer.addLines(segments[i:breaks[k]])
+                        writer.addPolyline(_chainVertices(segments, breaks[k], breaks[k + 1]))
+                        i = breaks[k + 1]
+                    writer.addLines(segments[i:])
+
+                    merged = len(segments) - (len(breaks) - 1)
+                elif self._order is not None:
+                    writer.addLines(self._exportSegments()[0])
+                else:
+                    for cut in self._cuts:
+                        writer.addLines(cut.segments.array)
+
+                writer.close()
+                span.segments = sum(len(cut.segments) for cut in self._cuts)
+                span.entities = writer.entities
+                span.bytes = f.tell()
+        else:
+            with _span('saveas', filename) as span:
+                self._dxf.saveas(f'{outputDir}/{filename}.dxf', fmt='bin' if binary else 'asc')
+                span.entities = len(self._dxf.modelspace())
+                span.bytes = os.path.getsize(f'{outputDir}/{filename}.dxf')
 
         # Save Config File
+        with _span('config', filename) as span, open(f'{outputDir}/{filename}.json', 'w') as f:
+            json.dump(self.dumpConfig(), f)
+            span.bytes = f.tell()
+
+        return merged
+
+    def saveGcode(self, filename, dialect='grbl', machine=None, power=1000, outputDir='./output'):
+        '''
+        Save X/A axis G-code for the pattern to `filename`.nc, skipping the DXF.
+        Segments are cut in the order they are exported, y turned into A
+        degrees on each cut's own OD.  Feed, A axis speed limit and pierce
+        dwell come from `machine` (a MachineProfile), `dialect` picks the templates (see
+        GCODE_DIALECTS).  Returns the number of pierces.
+        '''
+        machine = machine or MachineProfile()
+        segments, breaks, c = self._exportSegments(self._circumferences())
+
+        with _span('gcode', filename) as span, open(f'{outputDir}/{filename}.nc', 'w') as f, \
+                GcodeStreamWriter(f, dialect, feed=machine.feed * 60, power=power, pierceTime=machine.pierceTime, name=filename,
+                                  angularVelocity=machine.angularVelocity * 60) as writer:
+            writer.addChains(segments, breaks, c)
+            writer.close()
+            span.segments = len(segments)
+            span.entities = writer.moves
+            span.bytes = f.tell()
+
+        return writer.pierces
+
+    def dumpConfig(self):
         header = {SOFTWARE_NAME: {'Version': VERSION, 'Date': str(datetime.now())}}
         data = {}
         i = 0
@@ -328,21 +2700,211 @@ class CutPattern:
         
         header['config'] = data
 
-        with open(f'./output/{filename}.json', 'w') as f:
-            json.dump(header, f)
+        return header
+
+    @classmethod
+    def fromConfig(cls, config):
+        '''
+        Rebuild a pattern from a dumpConfig() dict (what save() writes to the
+        .json file).  The cuts are lazy: their geometry is only generated once
+        it is plotted or exported.
+        '''
+        header = config.get(SOFTWARE_NAME) if isinstance(config, dict) else None
+        if not header or 'config' not in config:
+            raise ValueError(f'Not a {SOFTWARE_NAME} config')
+
+        version = str(header.get('Version', ''))
+        if version.split('.')[0] != VERSION.split('.')[0]:
+            raise ValueError(f'Config was written by {SOFTWARE_NAME} {version}, this is {VERSION}')
+
+        pattern = cls()
+        for name, cutConfig in config['config'].items():
+            cutConfig = dict(cutConfig)
+            cutType = CUT_TYPES.get(cutConfig.pop('type', None))
+            if cutType is None:
+                raise ValueError(f'Unknown cut type for {name}')
+
+            pattern.add(cutType(**cutConfig, lazy=True))
+
+        return pattern
+
+    @classmethod
+    def load(cls, filename):
+        # Load a pattern from a .json config written by save()
+        with open(filename) as f:
+            return cls.fromConfig(json.load(f))
 
     def getCuts(self):
         return self._cuts
+
+    def segments(self):
+        # All cuts' segments in one array, shared with the cuts themselves
+        self.generate()
+        return Segments.concatenate([cut.segments for cut in self._cuts])
+
+    def iterSegments(self, chunkSize=65536):
+        '''
+        Yield the segments of every cut in turn as (chunkSize, 4) arrays (see
+        _Cut.iterSegments), for writing arbitrarily long programs in constant
+        memory:
+
+            with open(path, 'w') as f, DxfStreamWriter(f) as writer:
+                for chunk in pattern.iterSegments():
+                    writer.addLines(chunk)
+        '''
+        return _rechunk((chunk for cut in self._cuts for chunk in cut.iterSegments(chunkSize)), chunkSize)
+
+    def generate(self, workers=None):
+        '''
+        Generate every cut that has not been generated yet (lazy cuts) at the
+        same time.  The cuts are independent once their offsets are known, so
+        they are spread over `workers` threads (default: one per core) when
+        they all use the NumPy engines, which release the GIL, or over as many
+        processes when any of them runs the scalar reference loops.
+        '''
+        pending = list({id(cut): cut for cut in self._cuts if cut._segments is None}.values())
+        for cut in pending:
+            cut._checkBounded()
+
+        # Cache hits don't need a worker, and of identical cuts only the first is generated
+        cache = _geometryCache
+        keys, copies = {}, {}
+        if cache is not None:
+            for cut in list(pending):
+                start = perf_counter()
+                key = keys[id(cut)] = cache.key(cut)
+                if key in copies:
+                    copies[key].append(cut)
+                    pending.remove(cut)
+                    continue
+                entry = cache.get(key)
+                if entry is not None:
+                    cut._adopt(*entry)
+                    pending.remove(cut)
+                    if _stats is not None:
+                        _stats.record(Span('cache', self._label(cut), perf_counter() - start, len(cut.segments)))
+                else:
+                    copies[key] = []
+
+        def generate(cut):
+            with _span('generate', self._label(cut)) as span:
+                cut._generate()
+                span.segments = len(cut.segments)
+
+        workers = min(workers or os.cpu_count() or 1, len(pending))
+
+        if workers <= 1:
+            for cut in pending:
+                generate(cut)
+        elif all(getattr(cut, 'vectorized', True) for cut in pending):
+            from concurrent.futures import ThreadPoolExecutor
+
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                list(pool.map(generate, pending))
+        else:
+            from concurrent.futures import ProcessPoolExecutor
+
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                for cut, (segments, state, elapsed) in zip(pending, pool.map(_generateCut, pending)):
+                    cut._adopt(segments, state)
+                    if _stats is not None:
+                        _stats.record(Span('generate', self._label(cut), elapsed, len(segments)))
+
+        if cache is not None:
+            for cut in pending:
+                entry = cache.put(keys[id(cut)], cut.segments.array, cut._state())
+                cut._adopt(*entry)
+
+                # Copies are served what was just cached, they count as hits
+                for copy in copies[keys[id(cut)]]:
+                    start = perf_counter()
+                    copy._adopt(*entry)
+                    cache.hits += 1
+                    if _stats is not None:
+                        _stats.record(Span('cache', self._label(copy), perf_counter() - start, len(copy.segments)))
     
     def preview(self):
+        import matplotlib.pyplot as plt
+
         self.plot()
         plt.show()
 
-    def plot(self):
+    def plot(self, ax=None):
+        self.generate()
         for cut in self._cuts:
-            cut.plot()
+            cut.plot(ax)
+
+    def render(self, filename, width=1600, height=400, seam=True, labels=True, outputDir='./output'):
+        '''
+        Save a `width` x `height` PNG of the unrolled pattern to
+        `outputDir/filename.png` without a display, e.g. as a thumbnail of a
+        batch job.  The segments are rasterized straight from their arrays,
+        so even millions of them take well under a second.  With seam=True
+        the tube seam (A = 0 and A = 360) is drawn as grey lines, with
+        labels=True each cut is marked with its number as printCutTable()
+        shows it, centred over the cut and moved down where labels collide.  Returns the rendered (height, width, 3) image.
+        '''
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib import colors as mcolors
+
+        self.generate()
+        segments = [cut.segments.array for cut in self._cuts]
+        drawn = [s for s in segments if len(s)]
+        c = self._circumference() or 0
+
+        image = np.full((height, width, 3), 255, dtype=np.uint8)
+
+        if drawn:
+            # A pixel of margin all round so the outermost lines stay on the image
+            x0 = min(s[:, 0::2].min() for s in drawn)
+            x1 = max(s[:, 0::2].max() for s in drawn)
+            y0 = min(0, min(s[:, 1::2].min() for s in drawn))
+            y1 = max(c, max(s[:, 1::2].max() for s in drawn))
+            scaleX = (width - 3) / ((x1 - x0) or 1)
+            scaleY = (height - 3) / ((y1 - y0) or 1)
+            x0, y1 = x0 - 1 / scaleX, y1 + 1 / scaleY
+
+            if seam:
+                for y in {0, c}:
+                    row = int(round((y1 - y) * scaleY))
+                    if 0 <= row < height:
+                        image[row] = 192
+
+            palette = [mcolors.to_rgb(color) for color in mcolors.TABLEAU_COLORS.values()]
+            for i, s in enumerate(segments):
+                _rasterize(image, s, np.round(np.array(palette[i % len(palette)]) * 255), x0, y1, scaleX, scaleY)
+
+        fig = Figure(figsize=(width / 100, height / 100), dpi=100)
+        FigureCanvasAgg(fig)
+        fig.figimage(image)
+
+        if labels and drawn:
+            # Each label over the middle of its cut, a line lower wherever it would cover one already placed
+            renderer = fig.canvas.get_renderer()
+            placed = []
+            for i, s in enumerate(segments):
+                if not len(s):
+                    continue
+                text = fig.text(0, 0, str(i + 1), ha='center', va='top', fontsize=8,
+                                bbox={'facecolor': 'white', 'edgecolor': 'none', 'pad': 1})
+                box = text.get_window_extent(renderer)
+                half, line = box.width / 2 + 2, box.height + 3
+                x = ((s[:, 0::2].min() + s[:, 0::2].max()) / 2 - x0) * scaleX
+                x = min(max(x, half), width - half)
+                row = 0
+                while any(r == row and x - half < right and left < x + half for r, left, right in placed):
+                    row += 1
+                placed.append((row, x - half, x + half))
+                text.set_position((x / width, 1 - (2 + row * line) / height))
+
+        fig.savefig(f'{outputDir}/{filename}.png', dpi=100)
+
+        return image
 
     def printCutTable(self):
+        from prettytable import PrettyTable
+
         table = PrettyTable(['Cut #', 'Start X', 'Instances', 'Pitch'])
         table.align['Start X'] = 'l'
         table.align['Instances'] = 'r'
@@ -357,4 +2919,215 @@ class CutPattern:
             table.add_row([i, offsetX, instances, pitch])
             i += 1
 
-        print(table)
\ No newline at end of file
+        print(table)
+
+SWEEP_BATCH_SEGMENTS = 2**21
+
+def sweep(cutType, grid, minWidth=None, returnSegments=True, **params):
+    '''
+    Generate every combination of a parameter grid for CutSpiral or CutBrick
+    (the class or its name) in broadcast passes over a leading variant axis,
+    rather than one cut at a time.  `grid` maps constructor arguments to
+    lists of values, the variants being every combination of them (the last
+    one varying fastest); `params` are the arguments shared by all of them.
+    Variants that give arrays of the same shape (same instances, flags,
+    numRadialCuts and spiral direction) are generated together, up to
+    SWEEP_BATCH_SEGMENTS candidate segments at a time; fixed point spirals
+    are generated one by one.
+
+    Returns a dict with the arguments of each variant as 'params', its (N, 4)
+    segment array as 'segments' (with `returnSegments`, the same array the
+    cut on its own would generate) and (V,) arrays of metrics: segment
+    'count', total cut 'length', 'xNext' (x of the next instance or row) and
+    'minStrut', the narrowest strut under `minWidth` (default: each
+    variant's pitch) or inf if there are none.
+    '''
+    from itertools import product
+
+    cutType = CUT_TYPES[cutType] if isinstance(cutType, str) else cutType
+    names = list(grid)
+    variants = [{**params, **dict(zip(names, values))} for values in product(*(grid[name] for name in names))]
+    cuts = [cutType(**args, lazy=True) for args in variants]
+
+    v = len(cuts)
+    segments = [None] * v
+    count, length, xNext, minStrut = np.zeros(v, dtype=np.int64), np.zeros(v), np.full(v, np.nan), np.full(v, np.inf)
+
+    def measure(i, array):
+        cut = cuts[i]
+        count[i] = len(array)
+        length[i] = np.hypot(array[:, 2] - array[:, 0], array[:, 3] - array[:, 1]).sum()
+        # Widen the search until a strut turns up, narrow searches measure far fewer pairs
+        width = minWidth or abs(cut.pitch)
+        radius = width / 8
+        while True:
+            distance = _strutViolations(array, cut.c, min(radius, width))['distance']
+            if len(distance) or radius >= width:
+                break
+            radius *= 2
+        if len(distance):
+            minStrut[i] = distance[0]
+        if returnSegments:
+            segments[i] = array
+
+    groups = {}
+    for i, cut in enumerate(cuts):
+        groups.setdefault(cut._sweepKey(), []).append(i)
+
+    with _span('sweep', cutType.__name__) as span:
+        for key, members in groups.items():
+            if key is None:
+                for i in members:
+                    cuts[i]._generate()
+                    xNext[i] = getattr(cuts[i], 'xNext', np.nan)
+                    measure(i, cuts[i].segments.array)
+                continue
+
+            # One variant first to see how many candidate segments each takes
+            done, size = 0, None
+            while done < len(members):
+                batch = members[done:done + (1 if size is None else max(1, SWEEP_BATCH_SEGMENTS // size))]
+                grid, keep, nextX = type(cuts[batch[0]])._sweepGroup([cuts[i] for i in batch])
+                size = keep[0].size
+
+                parts = np.split(grid[keep], np.cumsum(keep.reshape(len(batch), -1).sum(axis=1))[:-1])
+                for i, part, x in zip(batch, parts, nextX.tolist()):
+                    xNext[i] = x
+                    measure(i, part)
+                done += len(batch)
+
+        span.segments = int(count.sum())
+
+    return {'params': variants, 'segments': segments if returnSegments else None,
+            'count': count, 'length': length, 'xNext': xNext, 'minStrut': minStrut}
+
+def _batchConfigs(configs):
+    # Config paths from a directory of .json files, a manifest listing them, or a list
+    if isinstance(configs, str) and os.path.isdir(configs):
+        return sorted(os.path.join(configs, name) for name in os.listdir(configs) if name.endswith('.json'))
+
+    if isinstance(configs, str):
+        base = os.path.dirname(configs)
+        with open(configs) as f:
+            if configs.endswith('.json'):
+                paths = json.load(f)
+            else:
+                paths = [line.strip() for line in f if line.strip() and not line.startswith('#')]
+        return [os.path.join(base, path) for path in paths]
+
+    return list(configs)
+
+def _batchInit(cacheDir):
+    if cacheDir is not None:
+        setGeometryCache(GeometryCache(directory=cacheDir))
+
+def _batchJob(path, outputDir, streaming, polylines, shareSegments, thumbnails=False, machine=None, gcode=None, blocks=False, binary=False):
+    '''
+    Generate and export one config in a worker process.  Segments are handed
+    back in a shared memory block rather than pickled.
+    '''
+    name = os.path.splitext(os.path.basename(path))[0]
+    result = {'name': name, 'config': path}
+
+    try:
+        start = perf_counter()
+        pattern = CutPattern.load(path)
+        # The batch already runs a process per core, one thread each is enough
+        pattern.generate(workers=1)
+        segments = pattern.segments().array
+        generated = perf_counter()
+
+        if not streaming:
+            pattern.draw(polylines, blocks)
+        pattern.save(name, streaming=streaming, polylines=polylines, blocks=blocks, binary=binary, outputDir=outputDir)
+        if thumbnails:
+            pattern.render(name, outputDir=outputDir)
+        if gcode is not None:
+            pattern.saveGcode(name, gcode, machine, outputDir=outputDir)
+        saved = perf_counter()
+
+        if machine is not None:
+            result['estimate'] = pattern.estimate(machine)
+    except Exception as e:
+        result['error'] = f'{type(e).__name__}: {e}'
+        return result
+
+    result['cuts'] = len(pattern.getCuts())
+    result['segments'] = len(segments)
+    result['generateTime'] = generated - start
+    result['saveTime'] = saved - generated
+    result['dxfBytes'] = os.path.getsize(f'{outputDir}/{name}.dxf')
+
+    if shareSegments and len(segments):
+        from multiprocessing import shared_memory, resource_tracker
+
+        shm = shared_memory.SharedMemory(create=True, size=segments.nbytes)
+        np.ndarray(segments.shape, dtype=segments.dtype, buffer=shm.buf)[:] = segments
+        # The parent unlinks it once read, stop this process' tracker doing it at exit
+        resource_tracker.unregister(shm._name, 'shared_memory')
+        result['shm'] = (shm.name, segments.shape)
+        shm.close()
+
+    return result
+
+def generateBatch(configs, outputDir='./output', workers=None, streaming=True, polylines=False, returnSegments=False, cacheDir=None, thumbnails=False, machine=None, gcode=None, blocks=False, binary=False):
+    '''
+    Generate geometry and DXF for many saved configs in parallel.
+
+    `configs` is a directory of .json configs, a manifest (text file with one
+    config path per line or a .json list of them) or a list of paths.  Each
+    config is loaded, generated and saved to `outputDir` under its own name in
+    a pool of `workers` processes (default: one per core).  With
+    `returnSegments` each result also holds the pattern's (N, 4) segment
+    array, passed back through shared memory.  With `cacheDir` the workers
+    share an on-disk GeometryCache.  With `thumbnails` a PNG preview is
+    rendered next to each DXF, and with a MachineProfile as `machine` each
+    result carries the pattern's estimate().  Naming a GCODE_DIALECTS entry
+    as `gcode` also writes X/A G-code next to each DXF.  With `blocks`
+    repeating sections are saved as DXF blocks (see draw()), and with
+    `binary` the DXFs are written as binary rather than ASCII.
+
+    Returns one summary dict per config, in the order given.
+    '''
+    from concurrent.futures import ProcessPoolExecutor
+
+    paths = _batchConfigs(configs)
+    os.makedirs(outputDir, exist_ok=True)
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_batchInit, initargs=(cacheDir,)) as pool:
+        futures = [pool.submit(_batchJob, path, outputDir, streaming, polylines, returnSegments, thumbnails, machine, gcode, blocks, binary) for path in paths]
+        results = [future.result() for future in futures]
+
+    for result in results:
+        if 'shm' in result:
+            from multiprocessing import shared_memory
+
+            name, shape = result.pop('shm')
+            shm = shared_memory.SharedMemory(name=name)
+            try:
+                result['segmentArray'] = np.ndarray(shape, dtype=np.float64, buffer=shm.buf).copy()
+            finally:
+                shm.close()
+                shm.unlink()
+        elif returnSegments and 'error' not in result:
+            result['segmentArray'] = np.empty((0, 4))
+
+    return results
+
+def printBatchSummary(results):
+    from prettytable import PrettyTable
+
+    estimates = any('estimate' in result for result in results)
+    table = PrettyTable(['Config', 'Cuts', 'Segments', 'Generate (s)', 'Save (s)', 'DXF (MB)'] + (['Cycle (min)'] if estimates else []))
+    table.align['Config'] = 'l'
+
+    for result in results:
+        if 'error' in result:
+            row = [result['name'], '', '', '', '', result['error']]
+        else:
+            row = [result['name'], result['cuts'], result['segments'], f"{result['generateTime']:.3f}", f"{result['saveTime']:.3f}", f"{result['dxfBytes'] / 2**20:.2f}"]
+        if estimates:
+            row.append(f"{result['estimate']['cycleTime'] / 60:.1f}" if 'estimate' in result else '')
+        table.add_row(row)
+
+    print(table)